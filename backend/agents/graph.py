@@ -1,19 +1,46 @@
-from typing import Dict, Any
+import time
+from typing import Callable, Dict, Any, Optional
 from . import planner, implementer, runner, fixer, reviewer
 from ..services import agl
+from ..services.cancellation import CancellationToken, RunCanceled
+from ..services.llm_client import collect_calls
 
 
-def execute_build(prompt: str) -> Dict[str, Any]:
+def execute_build(prompt: str, cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
     episode_id = f"build:{abs(hash(prompt))}"
     agl.emit_episode_start(episode_id, {"prompt_len": len(prompt)})
-    plan_out = planner.plan(prompt)
-    diffs = implementer.propose_edits(plan_out)
-    rc, out, err = runner.run_commands(["echo build"])
+    # LLM call observations and node timings travel back with the result
+    # (also from pool processes), where the worker turns them into metrics
+    node_durations: Dict[str, float] = {}
+    with collect_calls() as llm_calls:
+        try:
+            result = _execute_nodes(episode_id, prompt, cancel_token, node_durations)
+        except RunCanceled:
+            agl.emit_episode_end(episode_id, reward=0.0, meta={"status": "canceled"})
+            result = {"status": "canceled", "error": "Run was canceled"}
+    result["llm_calls"] = llm_calls
+    result["node_durations"] = node_durations
+    return result
+
+
+def _timed(durations: Dict[str, float], node: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    t0 = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        durations[node] = time.perf_counter() - t0
+
+
+def _execute_nodes(episode_id: str, prompt: str, cancel_token: Optional[CancellationToken],
+                   durations: Dict[str, float]) -> Dict[str, Any]:
+    plan_out = _timed(durations, "planner", planner.plan, prompt, cancel_token=cancel_token)
+    diffs = _timed(durations, "implementer", implementer.propose_edits, plan_out, cancel_token=cancel_token)
+    rc, out, err = _timed(durations, "runner", runner.run_commands, ["echo build"], cancel_token=cancel_token)
     if rc != 0:
-        fix = fixer.propose_fix(err)
+        fix = _timed(durations, "fixer", fixer.propose_fix, err)
         agl.emit_episode_end(episode_id, reward=0.0, meta={"status": "failed"})
         return {"status": "failed", "plan": plan_out, "diffs": diffs, "fix": fix}
-    review_out = reviewer.review(diffs)
+    review_out = _timed(durations, "reviewer", reviewer.review, diffs)
     agl.emit_reward(episode_id, 1.0 if review_out.get("approved") else 0.5, reasons="review decision")
     agl.emit_episode_end(episode_id, reward=1.0, meta={"status": "ok"})
     return {
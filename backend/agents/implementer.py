@@ -1,6 +1,7 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import asyncio
 from ..services.llm_client import LLMClient
+from ..services.cancellation import CancellationToken
 
 
 IMPLEMENTER_SYSTEM = (
@@ -9,7 +10,7 @@ IMPLEMENTER_SYSTEM = (
 )
 
 
-def propose_edits(plan_out: Dict[str, Any]) -> List[Dict[str, Any]]:
+def propose_edits(plan_out: Dict[str, Any], cancel_token: Optional[CancellationToken] = None) -> List[Dict[str, Any]]:
     async def _run() -> List[Dict[str, Any]]:
         client = LLMClient()
         plan_text = str(plan_out)
@@ -17,7 +18,7 @@ def propose_edits(plan_out: Dict[str, Any]) -> List[Dict[str, Any]]:
             {"role": "system", "content": IMPLEMENTER_SYSTEM},
             {"role": "user", "content": plan_text},
         ]
-        content = await client.chat("coding", messages, temperature=0.2, max_tokens=1024)
+        content = await client.chat("coding", messages, temperature=0.2, max_tokens=1024, cancel_token=cancel_token)
         try:
             import json
             diffs = json.loads(content)
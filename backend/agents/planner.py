@@ -1,6 +1,7 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import asyncio
 from ..services.llm_client import LLMClient
+from ..services.cancellation import CancellationToken
 
 
 PLANNER_SYSTEM = (
@@ -9,14 +10,14 @@ PLANNER_SYSTEM = (
 )
 
 
-def plan(prompt: str) -> Dict[str, Any]:
+def plan(prompt: str, cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
     async def _run() -> Dict[str, Any]:
         client = LLMClient()
         messages = [
             {"role": "system", "content": PLANNER_SYSTEM},
             {"role": "user", "content": prompt},
         ]
-        content = await client.chat("reasoning", messages, temperature=0.1, max_tokens=1024)
+        content = await client.chat("reasoning", messages, temperature=0.1, max_tokens=1024, cancel_token=cancel_token)
         # Very lenient parse; if parse fails, return a minimal plan
         try:
             import json
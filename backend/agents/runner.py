@@ -1,9 +1,12 @@
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from ..services import agl
+from ..services.cancellation import CancellationToken
 
 
-def run_commands(commands: List[str]) -> Tuple[int, str, str]:
-    # Stub: pretend success
+def run_commands(commands: List[str], cancel_token: Optional[CancellationToken] = None) -> Tuple[int, str, str]:
+    # Stub: pretend success; real execution goes through tools.exec.run_non_interactive(cancel_token=...)
+    if cancel_token is not None:
+        cancel_token.raise_if_canceled()
     agl.emit_tool_call("run_commands", {"commands": commands}, {"rc": 0}, success=True)
     return 0, "ok", ""
 
@@ -1,33 +1,78 @@
 """FastAPI application with persistent database and async queue processing."""
 
 import asyncio
+import hashlib
+import json
 import logging
 import os
 import uuid
 from contextlib import asynccontextmanager
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Dict, Any, List, Literal, Tuple
 
 import httpx
-from fastapi import FastAPI, HTTPException, Depends
+from prometheus_client import CONTENT_TYPE_LATEST
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..models import Run, RunLog, RunDiff, RunStatus, LogLevel
-from ..services.db import get_db, init_db, check_db_health
+from ..models import Run, RunLog, RunStatus, LogLevel
+from ..services.db import get_async_db, init_db, SessionLocal, AsyncSessionLocal, async_engine
+from ..services.health import db_health_monitor
+from ..services import metrics as prom_metrics
+from ..services.counters import run_counters, reconcile_periodically
+from ..services.log_sink import run_log_sink
+from ..services.events import run_events, LOG, STATUS
+from ..services.retention import RetentionPolicy, load_archive, retain_periodically
+from ..services.blobs import assemble_diffs, diffs_query
+from ..services.response_cache import CachedResponse, terminal_responses
+from ..services.concurrency import limiter_from_env
+from ..services.coalescing import COALESCING_ENABLED, build_fingerprint, find_inflight_duplicates
 from ..services.queue import queue_manager
-from ..services.state import create_run_state_manager
+from ..services.state import StatusTransitionValidator, create_run_state_manager
 from ..services.telemetry import write_run_report, log_event
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Run the queue worker inside the API process. Disable when build capacity is
+# provided by separate `python -m backend.worker` processes, so API replicas
+# (and uvicorn --workers) scale independently of workers.
+EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "true").lower() == "true"
+
+# Responses of terminal runs are cached in memory and sent with long-lived
+# cache headers once the run has been terminal this long, so that log lines
+# still buffered when it finished have been written
+TERMINAL_SETTLE_SECONDS = float(os.getenv("RESPONSE_CACHE_SETTLE_SECONDS", "10"))
+IMMUTABLE_CACHE_CONTROL = "max-age=31536000, immutable"
+
+# Upper bound on builds accepted by one POST /builds:batch
+MAX_BATCH_BUILDS = int(os.getenv("MAX_BATCH_BUILDS", "100"))
+
+# Event streams re-read their run from the database after this many idle
+# seconds; changes made by external workers only reach streams this way
+RUN_EVENTS_RESYNC_INTERVAL = float(
+    os.getenv("RUN_EVENTS_RESYNC_INTERVAL", "15" if EMBEDDED_WORKER else "2")
+)
+
+
+class BuildSettings(BaseModel):
+    # Free-form build settings; the fields below also drive queue scheduling
+    model_config = ConfigDict(extra="allow")
+    
+    priority: Optional[Literal["high", "normal", "low"]] = None
+    tenant: Optional[str] = Field(default=None, max_length=64)  # Owner for fair scheduling
+
 
 class BuildRequest(BaseModel):
     prompt: str
-    settings: Optional[Dict[str, Any]] = None
+    settings: Optional[BuildSettings] = None
     request_id: Optional[str] = None  # Optional idempotency key
 
 
@@ -45,15 +90,62 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("Database initialized")
     
+    # Run events from the worker, state changes and the log sink are
+    # delivered to /runs/{id}/events streams on this loop
+    run_events.bind()
+    
+    # Batch run log inserts; flushed on a size/time threshold and at shutdown
+    await run_log_sink.start()
+    
+    # Health endpoints answer from this monitor's cached probe
+    await db_health_monitor.start()
+    
+    # Keep in-memory run/queue counters in sync with changes made elsewhere
+    stop_reconcile = asyncio.Event()
+    lag_task = asyncio.create_task(prom_metrics.monitor_event_loop_lag(stop_reconcile))
+    reconcile_task = asyncio.create_task(reconcile_periodically(
+        AsyncSessionLocal,
+        interval=float(os.getenv("COUNTER_RECONCILE_INTERVAL", "30")),
+        stop_event=stop_reconcile
+    ))
+    
+    # Archive logs and diffs of old terminal runs (RUN_RETENTION_INTERVAL=0 disables)
+    retention_interval = float(os.getenv("RUN_RETENTION_INTERVAL", "3600"))
+    retention_task = None
+    if retention_interval > 0:
+        retention_task = asyncio.create_task(retain_periodically(
+            SessionLocal,
+            RetentionPolicy.from_env(),
+            interval=retention_interval,
+            stop_event=stop_reconcile
+        ))
+    
     # Start queue worker
-    await queue_manager.start_worker(max_concurrent=2)
-    logger.info("Queue worker started")
+    if EMBEDDED_WORKER:
+        max_concurrent = int(os.getenv("WORKER_MAX_CONCURRENT", "2"))
+        await queue_manager.start_worker(
+            max_concurrent=max_concurrent,
+            lease_seconds=float(os.getenv("QUEUE_LEASE_SECONDS", "60")),
+            max_attempts=int(os.getenv("QUEUE_MAX_ATTEMPTS", "3")),
+            limiter=limiter_from_env(initial=max_concurrent)
+        )
+        logger.info("Queue worker started")
+    else:
+        logger.info("Embedded queue worker disabled; runs are processed by external workers")
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
     await queue_manager.stop_worker()
+    stop_reconcile.set()
+    await reconcile_task
+    await lag_task
+    if retention_task:
+        await retention_task
+    await run_log_sink.stop()
+    await db_health_monitor.stop()
+    await async_engine.dispose()
     logger.info("Application shutdown complete")
 
 
@@ -70,31 +162,37 @@ app.add_middleware(
     allow_origins=[o.strip() for o in allowed_origins if o.strip()],
     allow_credentials=False,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match", "Last-Event-ID"],
+    expose_headers=["ETag"],
 )
 
 
 @app.get("/health")
-def health() -> Dict[str, Any]:
-    """Basic health check including database connectivity."""
-    db_healthy = check_db_health()
+async def health(deep: bool = False) -> Dict[str, Any]:
+    """Basic health check including database connectivity (cached; ?deep=1 probes now)."""
+    db_status = await db_health_monitor.status(deep=deep)
+    db_healthy = db_status["ok"]
     queue_status = queue_manager.get_queue_status()
     
     return {
         "status": "ok" if db_healthy else "degraded",
         "database": "ok" if db_healthy else "error",
+        "database_checked_at": db_status["checked_at"],
         "queue": queue_status
     }
 
 
 @app.get("/health/full")
-async def health_full() -> Dict[str, Any]:
+async def health_full(deep: bool = False) -> Dict[str, Any]:
     """Full health check including model hosts."""
     hosts = get_model_hosts()
+    db_status = await db_health_monitor.status(deep=deep)
+    db_healthy = db_status["ok"]
     out: Dict[str, Any] = {
         "status": "ok", 
         "models": {},
-        "database": "ok" if check_db_health() else "error"
+        "database": "ok" if db_healthy else "error",
+        "database_checked_at": db_status["checked_at"]
     }
     
     async with httpx.AsyncClient(timeout=5) as client:
@@ -111,55 +209,125 @@ async def health_full() -> Dict[str, Any]:
         except Exception:
             out["models"]["ollama"] = False
     
-    if not all(out["models"].values()) or not check_db_health():
+    if not all(out["models"].values()) or not db_healthy:
         out["status"] = "degraded"
     
     return out
 
 
-@app.post("/build")
-def build(req: BuildRequest, db: Session = Depends(get_db)) -> Dict[str, str]:
-    """Create a new build run and enqueue it for processing."""
-    # Check for idempotency
-    if req.request_id:
-        existing_run = db.query(Run).filter(Run.request_id == req.request_id).first()
-        if existing_run:
-            return {"run_id": existing_run.id}
+def _create_runs(db: Session, reqs: List[BuildRequest]) -> List[Dict[str, Any]]:
+    """
+    Create and enqueue runs for ``reqs`` in a single transaction.
     
-    # Create new run
-    run_id = str(uuid.uuid4())
-    run = Run(
-        id=run_id,
-        prompt=req.prompt,
-        settings_json=req.settings or {},
-        status=RunStatus.QUEUED,
-        current_node="planner",
-        request_id=req.request_id
-    )
+    Idempotency keys and in-flight duplicates are looked up with one query
+    each for the whole batch; runs, their initial log lines and queue items
+    are then inserted and committed together. Repeats within the batch
+    resolve to the same run. Requests carrying an idempotency key are never
+    coalesced: they get a run of their own, stored under the key, so a key
+    always resolves to exactly one run. The caller wakes the worker. Handlers run it
+    on their AsyncSession through ``run_sync``.
     
-    db.add(run)
-    db.commit()
+    Returns:
+        One ``{"run_id": ...}`` result per request, in order; duplicates
+        attached to an in-flight run carry ``"coalesced": True``
+    """
+    keys = {req.request_id for req in reqs if req.request_id}
+    by_key: Dict[str, str] = dict(
+        db.query(Run.request_id, Run.id).filter(Run.request_id.in_(keys)).all()
+    ) if keys else {}
     
-    # Add initial log
-    log_entry = RunLog(
-        run_id=run_id,
-        level=LogLevel.INFO,
-        message=f"Created run {run_id} with prompt: {req.prompt[:100]}..."
-    )
-    db.add(log_entry)
+    prepared = []
+    for req in reqs:
+        settings = req.settings or BuildSettings()
+        settings_json = settings.model_dump(exclude_none=True)
+        prepared.append((req, settings, settings_json, build_fingerprint(req.prompt, settings_json)))
+    
+    # Attach unkeyed duplicates (double clicks, fan-out repeats) to a matching run still in flight
+    by_fingerprint: Dict[str, str] = {}
+    if COALESCING_ENABLED:
+        inflight = find_inflight_duplicates(
+            db, [fingerprint for req, *_, fingerprint in prepared if not req.request_id]
+        )
+        by_fingerprint = {fingerprint: run.id for fingerprint, run in inflight.items()}
+    
+    results: List[Dict[str, Any]] = []
+    runs: List[Run] = []
+    logs: List[Dict[str, Any]] = []
+    queue_items: List[Tuple[str, Optional[str], Optional[str]]] = []
+    now = datetime.utcnow()
+    
+    for req, settings, settings_json, fingerprint in prepared:
+        if req.request_id and req.request_id in by_key:
+            results.append({"run_id": by_key[req.request_id]})
+            continue
+        
+        if COALESCING_ENABLED and not req.request_id and fingerprint in by_fingerprint:
+            run_id = by_fingerprint[fingerprint]
+            logs.append({"run_id": run_id, "level": LogLevel.INFO, "ts": now,
+                         "message": "Coalesced a duplicate build request onto this run"})
+            logger.info(f"Coalesced duplicate build request onto run {run_id}")
+            results.append({"run_id": run_id, "coalesced": True})
+            continue
+        
+        run_id = str(uuid.uuid4())
+        runs.append(Run(
+            id=run_id,
+            prompt=req.prompt,
+            settings_json=settings_json,
+            status=RunStatus.QUEUED,
+            current_node="planner",
+            request_id=req.request_id,
+            build_hash=fingerprint
+        ))
+        logs.append({"run_id": run_id, "level": LogLevel.INFO, "ts": now,
+                     "message": f"Created run {run_id} with prompt: {req.prompt[:100]}..."})
+        queue_items.append((run_id, settings.priority, settings.tenant))
+        by_fingerprint[fingerprint] = run_id
+        if req.request_id:
+            by_key[req.request_id] = run_id
+        results.append({"run_id": run_id})
+    
+    if runs:
+        db.add_all(runs)
+        run_counters.record(db, runs={RunStatus.QUEUED: len(runs)})
+        # Flush the runs before their logs and queue items reference them
+        db.flush()
+        queue_manager.add_queue_items(db, queue_items)
+    if logs:
+        db.execute(insert(RunLog), logs)
     db.commit()
     
-    # Enqueue for processing
-    if queue_manager.enqueue_run(run_id):
-        logger.info(f"Enqueued run {run_id}")
-    else:
-        logger.warning(f"Failed to enqueue run {run_id}")
+    if runs:
+        logger.info(f"Created and enqueued {len(runs)} runs")
+    return results
+
+
+@app.post("/build")
+async def build(req: BuildRequest, db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
+    """Create a new build run and enqueue it for processing."""
+    result = (await db.run_sync(_create_runs, [req]))[0]
+    queue_manager.wake_worker()
+    return result
+
+
+@app.post("/builds:batch")
+async def build_batch(reqs: List[BuildRequest], db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
+    """
+    Create and enqueue several build runs in one transaction.
+    
+    Returns the run ids in request order (``run_ids``) and the per-request
+    results as /build would return them (``runs``). The worker is woken once.
+    """
+    if len(reqs) > MAX_BATCH_BUILDS:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH_BUILDS} builds per batch")
     
-    return {"run_id": run_id}
+    results = await db.run_sync(_create_runs, reqs) if reqs else []
+    queue_manager.wake_worker()
+    return {"run_ids": [result["run_id"] for result in results], "runs": results}
 
 
 @app.post("/e2e")
-def e2e(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def e2e(db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """End-to-end test endpoint."""
     test_prompt = "Create a README.md with a one-line description."
     
@@ -174,29 +342,150 @@ def e2e(db: Session = Depends(get_db)) -> Dict[str, Any]:
     )
     
     db.add(run)
-    db.commit()
+    run_counters.record(db.sync_session, runs={RunStatus.QUEUED: 1})
+    await db.commit()
     
     # Enqueue for processing
-    queue_manager.enqueue_run(run_id)
+    await queue_manager.enqueue_run_async(run_id)
     
     return {"run_id": run_id, "status": RunStatus.QUEUED}
 
 
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _run_etag(run: Run, last_log_id: Optional[int]) -> str:
+    """
+    Version of a run's GET /runs/{id} response: its last update and newest log line.
+    
+    Settled terminal runs are versioned by what is fixed at completion
+    (status and ``updated_at``) only: their responses are marked immutable,
+    and retention later moves their log lines, ids included, to an archive.
+    """
+    updated = _naive_utc(run.updated_at).strftime("%Y%m%d%H%M%S%f")
+    if _is_settled_terminal(run):
+        return f'W/"{updated}-{run.status}"'
+    return f'W/"{updated}-{last_log_id or 0}"'
+
+
+def _is_settled_terminal(run: Run) -> bool:
+    """Whether the run's responses can no longer change (terminal for TERMINAL_SETTLE_SECONDS)."""
+    if not StatusTransitionValidator.is_terminal_status(run.status):
+        return False
+    age = datetime.utcnow() - _naive_utc(run.updated_at)
+    return age.total_seconds() >= TERMINAL_SETTLE_SECONDS
+
+
+def _serialize(content: Dict[str, Any]) -> bytes:
+    """Encode like FastAPI's JSONResponse, so cached and fresh bodies are identical."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _immutable_response(entry: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """Serve a cached terminal-run response, or 304 if the client already has it."""
+    headers = {"ETag": entry.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+async def _load_run_version(db: AsyncSession, run_id: str) -> Tuple[Optional[Run], Optional[str]]:
+    """The run and its ETag in one query (the newest log id comes from the (run_id, id) index)."""
+    last_log_id = select(func.max(RunLog.id)).where(RunLog.run_id == Run.id).scalar_subquery()
+    row = (await db.execute(select(Run, last_log_id).where(Run.id == run_id))).first()
+    if row is None:
+        return None, None
+    return row[0], _run_etag(row[0], row[1])
+
+
 @app.get("/runs/{run_id}")
-def get_run(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Get run status and logs."""
-    run = db.query(Run).filter(Run.id == run_id).first()
+async def get_run(
+    run_id: str,
+    response: Response,
+    wait: float = Query(0, ge=0, le=60, description="Long-poll: seconds to wait for a change from If-None-Match"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> Any:
+    """
+    Get run status and logs.
+    
+    Responses carry an ETag derived from ``updated_at`` and the newest log
+    id (the status, once a terminal run has settled); a matching
+    If-None-Match gets 304 without reading any logs. With
+    ``wait`` and If-None-Match, an unchanged run parks the request until it
+    changes (woken by ``run_events``) or ``wait`` seconds pass, then answers
+    200 with the new state or 304. Settled terminal runs are answered from
+    ``terminal_responses`` without touching the database.
+    """
+    cached = terminal_responses.get(("run", run_id))
+    if cached:
+        return _immutable_response(cached, if_none_match)
+    
+    # Subscribe before the first read so a change committed in between still wakes us
+    subscription = run_events.subscribe(run_id) if wait and if_none_match else None
+    try:
+        run, etag = await _load_run_version(db, run_id)
+        if subscription and run and _etag_matches(if_none_match, etag):
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + wait
+            while _etag_matches(if_none_match, etag) and loop.time() < deadline:
+                # Give the connection back (and end SQLite's read snapshot) while parked
+                await db.close()
+                remaining = deadline - loop.time()
+                item = await subscription.get(timeout=min(remaining, RUN_EVENTS_RESYNC_INTERVAL))
+                while item is not None:
+                    item = subscription.get_nowait()
+                run, etag = await _load_run_version(db, run_id)
+                if run is None:
+                    break
+    finally:
+        if subscription:
+            subscription.close()
+    
     if not run:
         raise HTTPException(status_code=404, detail="run not found")
     
-    # Get recent logs (last 50)
-    logs = db.query(RunLog).filter(
-        RunLog.run_id == run_id
-    ).order_by(RunLog.ts.desc()).limit(50).all()
+    # Clients revalidate every time; unchanged runs cost one indexed query
+    settled = _is_settled_terminal(run)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL if settled else "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     
-    log_messages = [log.message for log in reversed(logs)]
+    # Get recent logs (last 50); only the messages, without building ORM objects
+    messages = (await db.scalars(
+        select(RunLog.message).where(RunLog.run_id == run_id).order_by(RunLog.id.desc()).limit(50)
+    )).all()
     
-    return {
+    log_messages = list(reversed(messages))
+    
+    # Logs of archived runs live in their archive segment (plus any late rows)
+    if run.archived_at is not None and len(log_messages) < 50:
+        archive = await asyncio.to_thread(load_archive, run_id)
+        if archive:
+            archived_messages = [log["message"] for log in archive["logs"]]
+            log_messages = (archived_messages + log_messages)[-50:]
+    
+    content = {
         "run_id": run_id,
         "status": run.status,
         "current_node": run.current_node,
@@ -205,27 +494,226 @@ def get_run(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
         "updated_at": run.updated_at.isoformat(),
         "canceled": run.canceled
     }
+    
+    if settled:
+        entry = CachedResponse(body=_serialize(content), etag=etag)
+        terminal_responses.put(("run", run_id), entry.body, entry.etag)
+        return _immutable_response(entry, None)
+    return content
+
+
+@app.get("/runs/{run_id}/logs")
+async def get_logs(
+    run_id: str,
+    after: int = Query(0, ge=0, description="Cursor: return lines after this log id"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+) -> Dict[str, Any]:
+    """
+    Page through a run's logs in order.
+    
+    Keyset pagination on (run_id, id): each page is one index range scan,
+    so pollers passing the last ``next_cursor`` only pay for new lines.
+    """
+    run = await db.scalar(select(Run).where(Run.id == run_id))
+    if not run:
+        raise HTTPException(status_code=404, detail="run not found")
+    
+    lines, has_more = await _read_logs(db, run, after, limit)
+    
+    return {
+        "run_id": run_id,
+        "logs": lines,
+        "next_cursor": lines[-1]["id"] if lines else after,
+        "has_more": has_more
+    }
+
+
+async def _read_logs(db: AsyncSession, run: Run, after: int, limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """Up to ``limit`` log lines with id > ``after`` (archive first), and whether more follow."""
+    lines: list = []
+    if run.archived_at is not None:
+        archive = await asyncio.to_thread(load_archive, run.id)
+        if archive:
+            lines = [log for log in archive["logs"] if log["id"] > after][:limit + 1]
+    
+    if len(lines) <= limit:
+        rows = (await db.scalars(
+            select(RunLog).where(
+                RunLog.run_id == run.id,
+                RunLog.id > max([after] + [log["id"] for log in lines])
+            ).order_by(RunLog.id).limit(limit + 1 - len(lines))
+        )).all()
+        lines += [
+            {"id": row.id, "ts": row.ts.isoformat() if row.ts else None, "level": row.level, "message": row.message}
+            for row in rows
+        ]
+    
+    return lines[:limit], len(lines) > limit
+
+
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Format one Server-Sent Event."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _status_data(run: Run) -> Dict[str, Any]:
+    return {
+        "status": run.status,
+        "current_node": run.current_node,
+        "canceled": bool(run.canceled),
+        "updated_at": run.updated_at.isoformat(),
+    }
+
+
+async def _sync_run(run_id: str, after: int) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Current status and every log line after ``after``, read in one short-lived session."""
+    async with AsyncSessionLocal() as db:
+        run = await db.scalar(select(Run).where(Run.id == run_id))
+        if not run:
+            return None, []
+        lines: List[Dict[str, Any]] = []
+        while True:
+            page, has_more = await _read_logs(db, run, after, 500)
+            lines += page
+            if not has_more:
+                return _status_data(run), lines
+            after = page[-1]["id"]
+
+
+@app.get("/runs/{run_id}/events")
+async def run_event_stream(
+    run_id: str,
+    request: Request,
+    after: Optional[int] = Query(None, ge=0, description="Resume after this log id (like Last-Event-ID)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of a run's status changes and log lines.
+    
+    Sends a ``status`` event with the current state, then ``log`` events for
+    every line after the resume point, then changes as they are committed
+    (pushed by ``run_events``; the database is only read when new lines
+    arrive or after RUN_EVENTS_RESYNC_INTERVAL idle seconds). Log events
+    carry their log id as the event id, so a reconnecting EventSource
+    resumes through Last-Event-ID without gaps or repeats. Ends with an
+    ``end`` event once the run is terminal.
+    """
+    cursor = after or 0
+    if last_event_id and last_event_id.isdigit():
+        cursor = max(cursor, int(last_event_id))
+    
+    # Subscribe before the first read so nothing committed in between is missed
+    subscription = run_events.subscribe(run_id)
+    try:
+        status, lines = await _sync_run(run_id, cursor)
+    except Exception:
+        subscription.close()
+        raise
+    if status is None:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="run not found")
+    
+    async def stream() -> AsyncIterator[str]:
+        nonlocal cursor, status, lines
+        with subscription:
+            yield "retry: 3000\n\n"
+            last_status = None
+            ends_at = None
+            while True:
+                if status is not None and status != last_status:
+                    last_status = status
+                    yield _sse(STATUS, status)
+                    if ends_at is None and StatusTransitionValidator.is_terminal_status(status["status"]):
+                        # Wait out the log sink so the final lines make it into the stream
+                        ends_at = asyncio.get_running_loop().time() + 2 * run_log_sink.flush_interval + 0.5
+                for line in lines:
+                    if line["id"] > cursor:
+                        cursor = line["id"]
+                        yield _sse(LOG, line, event_id=cursor)
+                status, lines = None, []
+                
+                now = asyncio.get_running_loop().time()
+                if ends_at is not None and now >= ends_at:
+                    _, lines = await _sync_run(run_id, cursor)
+                    for line in lines:
+                        cursor = line["id"]
+                        yield _sse(LOG, line, event_id=cursor)
+                    yield _sse("end", {"status": last_status["status"]})
+                    return
+                
+                timeout = RUN_EVENTS_RESYNC_INTERVAL if ends_at is None else ends_at - now
+                item = await subscription.get(timeout=timeout)
+                if item is None or subscription.overflowed:
+                    if await request.is_disconnected():
+                        return
+                    subscription.overflowed = False
+                    if ends_at is None:
+                        status, lines = await _sync_run(run_id, cursor)
+                    if not lines and status == last_status:
+                        yield ": keepalive\n\n"
+                    continue
+                
+                # Drain what is queued, then read new lines once. Log ids are
+                # not contiguous per run and other processes may log too, so
+                # lines come from the database rather than the event payloads.
+                new_lines = False
+                while item is not None:
+                    if item["type"] == STATUS:
+                        status = item["data"]
+                    elif item["data"]["id"] > cursor:
+                        new_lines = True
+                    item = subscription.get_nowait()
+                if new_lines:
+                    status, lines = await _sync_run(run_id, cursor)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.get("/runs/{run_id}/diffs")
-def get_diffs(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Get run diffs."""
-    run = db.query(Run).filter(Run.id == run_id).first()
+async def get_diffs(
+    run_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> Any:
+    """
+    Get run diffs.
+    
+    Diffs of settled terminal runs are served pre-serialized from
+    ``terminal_responses`` with an ETag and long-lived Cache-Control.
+    """
+    cached = terminal_responses.get(("diffs", run_id))
+    if cached:
+        return _immutable_response(cached, if_none_match)
+    
+    run = await db.scalar(select(Run).where(Run.id == run_id))
     if not run:
         raise HTTPException(status_code=404, detail="run not found")
     
-    diffs = db.query(RunDiff).filter(
-        RunDiff.run_id == run_id
-    ).order_by(RunDiff.idx).all()
+    # Diffs and their content blobs in one query
+    diff_contents = assemble_diffs((await db.execute(diffs_query(run_id))).all())
     
-    diff_contents = [diff.content_json for diff in diffs]
+    if run.archived_at is not None and not diff_contents:
+        archive = await asyncio.to_thread(load_archive, run_id)
+        if archive:
+            diff_contents = [diff["content"] for diff in archive["diffs"]]
     
-    return {"run_id": run_id, "diffs": diff_contents}
+    content = {"run_id": run_id, "diffs": diff_contents}
+    if _is_settled_terminal(run):
+        body = _serialize(content)
+        entry = CachedResponse(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        terminal_responses.put(("diffs", run_id), entry.body, entry.etag)
+        return _immutable_response(entry, if_none_match)
+    return content
 
 
-@app.post("/runs/{run_id}/approve")
-def approve(run_id: str, req: ApproveRequest, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Approve a run step."""
+def _approve_run(db: Session, run_id: str) -> None:
+    """Move a run awaiting approval to approved; raises HTTPException otherwise."""
     state_manager = create_run_state_manager(db)
     
     if not state_manager.can_approve(run_id):
@@ -235,24 +723,23 @@ def approve(run_id: str, req: ApproveRequest, db: Session = Depends(get_db)) ->
         )
     
     # Transition to approved
-    if state_manager.transition_status(run_id, RunStatus.APPROVED):
-        # Add log entry
-        log_entry = RunLog(
-            run_id=run_id,
-            level=LogLevel.INFO,
-            message=f"Approved step {req.step_id}"
-        )
-        db.add(log_entry)
-        db.commit()
-        
-        return {"ok": True}
-    else:
+    if not state_manager.transition_status(run_id, RunStatus.APPROVED):
         raise HTTPException(status_code=404, detail="run not found")
 
 
-@app.post("/runs/{run_id}/cancel")
-def cancel(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Cancel a run."""
+@app.post("/runs/{run_id}/approve")
+async def approve(run_id: str, req: ApproveRequest, db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
+    """Approve a run step."""
+    await db.run_sync(_approve_run, run_id)
+    
+    # Add log entry
+    run_log_sink.add(run_id, LogLevel.INFO, f"Approved step {req.step_id}")
+    
+    return {"ok": True}
+
+
+def _cancel_run(db: Session, run_id: str) -> None:
+    """Flag a run canceled and move it to canceled; raises HTTPException otherwise."""
     state_manager = create_run_state_manager(db)
     
     if not state_manager.can_cancel(run_id):
@@ -267,30 +754,41 @@ def cancel(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
         raise HTTPException(status_code=404, detail="run not found")
     
     run.canceled = True
-    if state_manager.transition_status(run_id, RunStatus.CANCELED):
-        # Add log entry
-        log_entry = RunLog(
-            run_id=run_id,
-            level=LogLevel.INFO,
-            message="Run canceled by user"
-        )
-        db.add(log_entry)
-        db.commit()
-        
-        return {"ok": True}
-    else:
+    if not state_manager.transition_status(run_id, RunStatus.CANCELED):
         raise HTTPException(status_code=500, detail="Failed to cancel run")
 
 
+@app.post("/runs/{run_id}/cancel")
+async def cancel(run_id: str, db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
+    """Cancel a run."""
+    await db.run_sync(_cancel_run, run_id)
+    
+    # Add log entry
+    run_log_sink.add(run_id, LogLevel.INFO, "Run canceled by user")
+    
+    # Abort the in-flight pipeline right away if this process runs it;
+    # workers elsewhere pick up the canceled flag within a second
+    await queue_manager.cancel_run(run_id)
+    
+    return {"ok": True}
+
+
 @app.get("/metrics")
-def metrics(db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Basic metrics endpoint."""
+async def metrics() -> Response:
+    """Prometheus exposition of queue, pipeline, LLM, database and event-loop metrics."""
+    return Response(content=prom_metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/metrics/summary")
+async def metrics_summary() -> Dict[str, Any]:
+    """Basic JSON metrics, served from in-memory counters."""
     # Count runs by status
-    status_counts = {}
-    for status in [RunStatus.QUEUED, RunStatus.RUNNING, RunStatus.COMPLETED, 
-                   RunStatus.FAILED, RunStatus.CANCELED]:
-        count = db.query(Run).filter(Run.status == status).count()
-        status_counts[status] = count
+    all_counts = run_counters.runs_by_status()
+    status_counts = {
+        status: all_counts[status]
+        for status in [RunStatus.QUEUED, RunStatus.RUNNING, RunStatus.COMPLETED,
+                       RunStatus.FAILED, RunStatus.CANCELED]
+    }
     
     # Queue status
     queue_status = queue_manager.get_queue_status()
@@ -298,7 +796,8 @@ def metrics(db: Session = Depends(get_db)) -> Dict[str, Any]:
     return {
         "runs_by_status": status_counts,
         "queue": queue_status,
-        "total_runs": sum(status_counts.values())
+        "total_runs": sum(status_counts.values()),
+        "response_cache": terminal_responses.stats()
     }
 
 
@@ -311,7 +810,7 @@ def get_model_hosts() -> Dict[str, str]:
 
 
 @app.get("/config/models")
-def model_config() -> Dict[str, Any]:
+async def model_config() -> Dict[str, Any]:
     """Get model configuration."""
     return {
         "hosts": get_model_hosts(),
@@ -0,0 +1,213 @@
+"""Load benchmark for GET /runs/{id}: requests per second and latency at many concurrent clients.
+
+Starts the API under uvicorn (no embedded worker) against a throwaway SQLite
+database seeded with ``--runs`` runs of ``--logs`` log lines each, then
+drives it from ``--procs`` client processes holding ``--clients`` keep-alive
+connections in total, each issuing requests back to back for ``--duration``
+seconds. Two scenarios are measured:
+
+* active: runs still in flight, answered from the database every time
+* terminal: finished runs, answered from the terminal-run response cache
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_api_load [--clients 500] [--duration 10] [--procs N] [--workers 1]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+# Point the app (and the server started below) at a throwaway database before
+# any backend module is imported
+_TMP_DIR = tempfile.mkdtemp(prefix="bench_api_load_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/app.db"
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from ..models import Base, LogLevel, Run, RunLog, RunStatus  # noqa: E402
+from ..services.db import create_db_engine  # noqa: E402
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def seed(url: str, runs: int, logs: int) -> Tuple[List[str], List[str]]:
+    """Create active and settled terminal runs; returns (active ids, terminal ids)."""
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    finished_at = datetime.utcnow() - timedelta(hours=1)
+    active, terminal = [], []
+    with sessionmaker(bind=engine)() as db:
+        for i in range(runs):
+            run_id = str(uuid.uuid4())
+            if i % 2:
+                db.add(Run(id=run_id, prompt="bench", settings_json={}, status=RunStatus.COMPLETED,
+                           created_at=finished_at, updated_at=finished_at))
+                terminal.append(run_id)
+            else:
+                db.add(Run(id=run_id, prompt="bench", settings_json={}, status=RunStatus.RUNNING))
+                active.append(run_id)
+        db.flush()
+        db.execute(insert(RunLog), [
+            {"run_id": run_id, "level": LogLevel.INFO, "message": f"step {j} of the build pipeline finished"}
+            for run_id in active + terminal for j in range(logs)
+        ])
+        db.commit()
+    engine.dispose()
+    return active, terminal
+
+
+def start_server(url: str, port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": url, "EMBEDDED_WORKER": "false", "RUN_RETENTION_INTERVAL": "0"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=_REPO_ROOT, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API server did not start")
+
+
+async def _get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str) -> int:
+    """One GET on a kept-alive connection; returns the status code."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _drive(port: int, run_ids: List[str], clients: int, warmup: float,
+                 duration: float) -> Tuple[List[float], int]:
+    """
+    Issue requests from ``clients`` connections; returns (latencies in ms, errors).
+
+    Uses bare HTTP/1.1 over asyncio streams: a full HTTP client costs more CPU
+    per request than the API does, and would make the client the bottleneck.
+    """
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    async def loop(i: int) -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        n = i
+        try:
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= stop_at:
+                    return
+                try:
+                    ok = await _get(reader, writer, f"/runs/{run_ids[n % len(run_ids)]}") == 200
+                except (OSError, asyncio.IncompleteReadError):
+                    ok = False
+                    writer.close()
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                t1 = time.perf_counter()
+                if t0 >= measure_from:
+                    latencies.append((t1 - t0) * 1000.0)
+                    errors += not ok
+                n += clients
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(loop(i) for i in range(clients)))
+    return latencies, errors
+
+
+def _client_process(port: int, run_ids: List[str], clients: int, warmup: float,
+                    duration: float, results) -> None:
+    results.put(asyncio.run(_drive(port, run_ids, clients, warmup, duration)))
+
+
+def measure(port: int, run_ids: List[str], clients: int, procs: int, warmup: float,
+            duration: float) -> dict:
+    """Spread ``clients`` connections over ``procs`` processes so the client isn't the bottleneck."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    shares = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+    workers = [
+        ctx.Process(target=_client_process, args=(port, run_ids, share, warmup, duration, results))
+        for share in shares if share
+    ]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = sorted(latency for part, _ in collected for latency in part) or [0.0]
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "max": latencies[-1],
+        "errors": sum(errors for _, errors in collected),
+    }
+
+
+def main():
+    """Run the API load benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500, help="Concurrent connections in total")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Client processes")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--logs", type=int, default=50, help="Log lines per run")
+    args = parser.parse_args()
+
+    url = os.environ["DATABASE_URL"]
+    active, terminal = seed(url, args.runs, args.logs)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = start_server(url, port, args.workers)
+
+    print(f"\nGET /runs/{{id}}: {args.clients} concurrent clients ({args.procs} client processes), "
+          f"{args.workers} uvicorn worker(s), {args.duration:.0f}s per scenario")
+    try:
+        for name, run_ids in (("active", active), ("terminal", terminal)):
+            r = measure(port, run_ids, args.clients, args.procs, args.warmup, args.duration)
+            print(
+                f"{name:<9} {r['rps']:8.0f} req/s  requests={r['requests']:7d} "
+                f"p50={r['p50']:7.1f}ms p99={r['p99']:7.1f}ms max={r['max']:7.1f}ms errors={r['errors']}"
+            )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
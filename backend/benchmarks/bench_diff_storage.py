@@ -0,0 +1,123 @@
+"""Benchmark diff storage size and GET /runs/{id}/diffs latency for iterative builds.
+
+Each simulated run rewrites a project of ``--files`` files where only
+``--changed`` files differ from the previous run, as when a user iterates
+on one prompt. Compares inline JSON diffs with content-addressed blobs.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_diff_storage [--runs 50] [--files 20] [--changed 2]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+# Point the app at a throwaway database before any backend module is imported
+_TMP_DIR = tempfile.mkdtemp(prefix="bench_diff_storage_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/app.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from ..app.main import app  # noqa: E402
+from ..models import Base, Run, RunDiff, RunStatus  # noqa: E402
+from ..services.blobs import store_diffs  # noqa: E402
+from ..services.db import create_async_db_engine, create_db_engine, get_async_db  # noqa: E402
+
+
+def make_project(version: list, files: int, changed: int, run: int) -> list:
+    """Diffs of one run: ``changed`` files are edited relative to the previous run."""
+    for i in range(changed):
+        path = (run * changed + i) % files
+        version[path] += 1
+    return [
+        {
+            "path": f"src/module_{i}.py",
+            "content": "".join(f"def f_{i}_{j}(x):\n    return x * {version[i]} + {j}\n\n" for j in range(60)),
+        }
+        for i in range(files)
+    ]
+
+
+def measure(mode: str, runs: int, files: int, changed: int, reads: int) -> dict:
+    url = f"sqlite:///{_TMP_DIR}/{mode}.db"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_db_engine(url)
+    async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    version = [0] * files
+    run_ids = []
+    written = 0
+    t0 = time.perf_counter()
+    for run in range(runs):
+        diffs = make_project(version, files, changed, run)
+        run_id = str(uuid.uuid4())
+        run_ids.append(run_id)
+        with session_factory() as db:
+            db.add(Run(id=run_id, prompt="bench", settings_json={}, status=RunStatus.COMPLETED))
+            if mode == "inline":
+                db.add_all([RunDiff(run_id=run_id, idx=idx, content_json=diff) for idx, diff in enumerate(diffs)])
+            else:
+                store_diffs(db, run_id, diffs)
+            db.commit()
+        written += sum(len(diff["content"]) for diff in diffs)
+    write_s = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        page_size = conn.execute(text("PRAGMA page_size")).scalar()
+        pages = conn.execute(text("PRAGMA page_count")).scalar()
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    latencies = []
+    with TestClient(app) as client:
+        for i in range(reads):
+            t1 = time.perf_counter()
+            response = client.get(f"/runs/{run_ids[i % runs]}/diffs")
+            latencies.append((time.perf_counter() - t1) * 1000.0)
+            assert response.status_code == 200 and len(response.json()["diffs"]) == files
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+    return {
+        "db_kb": page_size * pages / 1024,
+        "content_kb": written / 1024,
+        "write_ms_per_run": write_s * 1000.0 / runs,
+        "read_p50": statistics.median(latencies),
+        "read_p99": sorted(latencies)[max(0, int(len(latencies) * 0.99) - 1)],
+    }
+
+
+def main():
+    """Run the diff storage benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--changed", type=int, default=2, help="Files edited between consecutive runs")
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"\n{args.runs} runs x {args.files} files, {args.changed} changed per run")
+    for mode in ("inline", "blobs"):
+        r = measure(mode, args.runs, args.files, args.changed, args.reads)
+        print(
+            f"{mode:<7} db={r['db_kb']:9.1f}KB (content {r['content_kb']:.1f}KB) "
+            f"write={r['write_ms_per_run']:6.2f}ms/run "
+            f"GET diffs p50={r['read_p50']:6.2f}ms p99={r['read_p99']:6.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark enqueue-to-RUNNING latency for polling vs event-driven queue wakeups.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_queue_wakeup [--runs 20]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+# Point the app at a throwaway database before any backend module is imported
+_TMP_DIR = tempfile.mkdtemp(prefix="bench_queue_wakeup_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/app.db"
+
+from ..models import Run, RunStatus  # noqa: E402
+from ..services.db import AsyncSessionLocal, init_db  # noqa: E402
+from ..services.log_sink import run_log_sink  # noqa: E402
+from ..services.queue import QueueManager, QueueWorker  # noqa: E402
+
+
+class BenchWorker(QueueWorker):
+    """Worker that records dispatch times and skips the real build pipeline."""
+
+    def __init__(self, started: dict, event_driven: bool, **kwargs):
+        super().__init__(**kwargs)
+        self.started = started
+        self.event_driven = event_driven
+
+    def notify(self):
+        # The polling baseline ignores wakeups, like the worker did before
+        if self.event_driven:
+            super().notify()
+
+    async def _process_run(self, claim):
+        self.started[claim.run_id] = time.perf_counter()
+        await super()._process_run(claim)
+
+    async def _execute_build_async(self, run_id: str, token):
+        return {"status": "ok", "diffs": []}
+
+
+async def measure(event_driven: bool, poll_interval: float, runs: int) -> list:
+    """Return enqueue-to-RUNNING latencies in milliseconds."""
+    started: dict = {}
+    manager = QueueManager()
+    manager.worker = BenchWorker(
+        started,
+        event_driven,
+        max_concurrent=2,
+        poll_interval=poll_interval,
+    )
+    worker_task = asyncio.create_task(manager.worker.start())
+    await asyncio.sleep(0.1)
+
+    latencies = []
+    for _ in range(runs):
+        run_id = str(uuid.uuid4())
+        async with AsyncSessionLocal() as db:
+            db.add(Run(id=run_id, prompt="bench", settings_json={}, status=RunStatus.QUEUED))
+            await db.commit()
+
+        # Spread enqueues so they don't line up with the poll tick
+        await asyncio.sleep(random.uniform(0.05, 0.5))
+        t0 = time.perf_counter()
+        await manager.enqueue_run_async(run_id)
+        while run_id not in started:
+            await asyncio.sleep(0.001)
+        latencies.append((started[run_id] - t0) * 1000.0)
+
+    await manager.stop_worker()
+    await worker_task
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<28} mean={statistics.mean(ordered):8.1f}ms "
+        f"p50={statistics.median(ordered):8.1f}ms p95={p95:8.1f}ms max={ordered[-1]:8.1f}ms"
+    )
+
+
+async def main_async(runs: int) -> None:
+    init_db()
+    # Buffer run logs like the API and worker do
+    await run_log_sink.start()
+    try:
+        before = await measure(event_driven=False, poll_interval=1.0, runs=runs)
+        after = await measure(event_driven=True, poll_interval=30.0, runs=runs)
+    finally:
+        await run_log_sink.stop()
+
+    print(f"\nEnqueue-to-RUNNING latency over {runs} runs")
+    report("before (1s polling)", before)
+    report("after (event-driven)", after)
+
+
+def main():
+    """Run the queue wakeup benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.runs))
+
+
+if __name__ == "__main__":
+    main()
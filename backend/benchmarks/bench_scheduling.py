@@ -0,0 +1,132 @@
+"""Simulate queue-wait percentiles per priority class for FIFO vs weighted fair dequeue.
+
+Scenario: one "bulk" tenant dumps a large batch of normal builds at t=0 while
+interactive tenants keep submitting high/normal/low builds at a steady rate.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_scheduling [--workers 2] [--bulk 200]
+"""
+
+import argparse
+import heapq
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from ..services.scheduling import PRIORITY_WEIGHTS, QueueCandidate, WeightedFairPolicy
+
+EPOCH = datetime(2024, 1, 1)
+
+
+class FifoPolicy:
+    """Baseline: strict FIFO by enqueue time, like the queue before priorities."""
+
+    def select(self, candidates: List[QueueCandidate],
+               running_by_tenant: Dict[str, int]) -> Optional[QueueCandidate]:
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: (c.enqueued_at, c.item_id))
+
+
+def build_workload(bulk: int, interactive: int, seed: int) -> List[QueueCandidate]:
+    """Return all submissions, ordered by arrival time."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(bulk):
+        items.append(QueueCandidate(len(items), f"bulk-{i}", "normal", "bulk", EPOCH))
+
+    t = 0.0
+    for i in range(interactive):
+        t += rng.expovariate(1 / 60.0)  # one interactive build every ~60s
+        priority = rng.choices(list(PRIORITY_WEIGHTS), weights=[2, 5, 3])[0]
+        tenant = f"team-{rng.randint(1, 5)}"
+        items.append(QueueCandidate(len(items), f"{tenant}-{i}", priority, tenant, EPOCH + timedelta(seconds=t)))
+
+    return sorted(items, key=lambda c: (c.enqueued_at, c.item_id))
+
+
+def simulate(policy, workload: List[QueueCandidate], workers: int, seed: int) -> Dict[str, List[float]]:
+    """Discrete-event simulation; returns queue waits in seconds keyed by class and tenant group."""
+    rng = random.Random(seed)
+    service_time = {c.item_id: rng.uniform(20.0, 100.0) for c in workload}
+
+    pending = list(workload)
+    queued: List[QueueCandidate] = []
+    completions: List[tuple] = []  # (finish_time, item_id, tenant)
+    running_by_tenant: Dict[str, int] = defaultdict(int)
+    waits: Dict[str, List[float]] = defaultdict(list)
+    now = 0.0
+
+    while pending or queued or completions:
+        # Admit arrivals up to now
+        while pending and (pending[0].enqueued_at - EPOCH).total_seconds() <= now:
+            queued.append(pending.pop(0))
+
+        # Fill free worker slots
+        while len(completions) < workers and queued:
+            heads: Dict[tuple, QueueCandidate] = {}
+            for item in queued:
+                key = (item.priority, item.tenant)
+                if key not in heads:
+                    heads[key] = item
+            chosen = policy.select(list(heads.values()), running_by_tenant)
+            if chosen is None:
+                break
+            queued.remove(chosen)
+            running_by_tenant[chosen.tenant] += 1
+            wait = now - (chosen.enqueued_at - EPOCH).total_seconds()
+            waits[chosen.priority].append(wait)
+            waits["bulk tenant" if chosen.tenant == "bulk" else "other tenants"].append(wait)
+            heapq.heappush(completions, (now + service_time[chosen.item_id], chosen.item_id, chosen.tenant))
+
+        # Advance to the next event
+        next_arrival = (pending[0].enqueued_at - EPOCH).total_seconds() if pending else float("inf")
+        next_completion = completions[0][0] if completions else float("inf")
+        now = min(next_arrival, next_completion)
+        while completions and completions[0][0] <= now:
+            _, _, tenant = heapq.heappop(completions)
+            running_by_tenant[tenant] -= 1
+
+    return waits
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def report(label: str, waits: Dict[str, List[float]]) -> None:
+    print(f"\n{label}")
+    print(f"  {'group':<14}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}   (queue wait, minutes)")
+    for group in list(PRIORITY_WEIGHTS) + ["bulk tenant", "other tenants"]:
+        values = waits.get(group, [])
+        if not values:
+            continue
+        print(
+            f"  {group:<14}{len(values):>5}"
+            f"{percentile(values, 50) / 60:>10.1f}{percentile(values, 95) / 60:>10.1f}{percentile(values, 99) / 60:>10.1f}"
+        )
+
+
+def main():
+    """Run the scheduling simulation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--bulk", type=int, default=200)
+    parser.add_argument("--interactive", type=int, default=150)
+    parser.add_argument("--tenant-cap", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workload = build_workload(args.bulk, args.interactive, args.seed)
+    report("FIFO (before)", simulate(FifoPolicy(), workload, args.workers, args.seed))
+    report(
+        f"Weighted fair, weights={PRIORITY_WEIGHTS}, tenant cap={args.tenant_cap}",
+        simulate(WeightedFairPolicy(tenant_max_concurrent=args.tenant_cap), workload, args.workers, args.seed),
+    )
+
+
+if __name__ == "__main__":
+    main()
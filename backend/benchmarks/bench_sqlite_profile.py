@@ -0,0 +1,131 @@
+"""Benchmark run log write throughput and concurrent /runs/{id} read latency per SQLite profile.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_sqlite_profile [--writers 4] [--logs 250] [--readers 8]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+# Point the app at a throwaway database before any backend module is imported
+_TMP_DIR = tempfile.mkdtemp(prefix="bench_sqlite_profile_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/app.db"
+
+import httpx  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from ..app.main import app  # noqa: E402
+from ..models import Base, Run, RunLog, RunStatus, LogLevel  # noqa: E402
+from ..services.db import create_async_db_engine, create_db_engine, get_async_db, get_db  # noqa: E402
+
+
+async def measure(profile: str, writers: int, logs_per_writer: int, readers: int) -> dict:
+    """Write logs from ``writers`` threads while ``readers`` clients poll GET /runs/{id}."""
+    url = f"sqlite:///{_TMP_DIR}/{profile}.db"
+    engine = create_db_engine(url, profile=profile)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_db_engine(url, profile=profile)
+    async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    run_ids = [str(uuid.uuid4()) for _ in range(writers)]
+    with session_factory() as db:
+        db.add_all([Run(id=run_id, prompt="bench", settings_json={}, status=RunStatus.RUNNING) for run_id in run_ids])
+        db.commit()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    writing = threading.Event()
+    writing.set()
+    read_latencies: list = []
+    errors: list = []
+    lock = threading.Lock()
+
+    def write(run_id: str) -> None:
+        # One commit per line, like the worker's log writes
+        for i in range(logs_per_writer):
+            try:
+                with session_factory() as db:
+                    db.add(RunLog(run_id=run_id, level=LogLevel.INFO, message=f"log line {i}"))
+                    db.commit()
+            except Exception as e:
+                with lock:
+                    errors.append(f"write: {e}")
+
+    async def read(client: httpx.AsyncClient, run_id: str) -> None:
+        while writing.is_set():
+            t0 = time.perf_counter()
+            response = await client.get(f"/runs/{run_id}")
+            read_latencies.append((time.perf_counter() - t0) * 1000.0)
+            if response.status_code != 200:
+                errors.append(f"read: HTTP {response.status_code}")
+
+    # Readers share one event loop, like requests served by one API process
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        reader_tasks = [asyncio.create_task(read(client, run_ids[i % writers])) for i in range(readers)]
+        writer_threads = [threading.Thread(target=write, args=(run_id,)) for run_id in run_ids]
+
+        t0 = time.perf_counter()
+        for thread in writer_threads:
+            thread.start()
+        await asyncio.to_thread(lambda: [thread.join() for thread in writer_threads])
+        elapsed = time.perf_counter() - t0
+
+        writing.clear()
+        await asyncio.gather(*reader_tasks)
+
+    app.dependency_overrides.clear()
+    engine.dispose()
+    await async_engine.dispose()
+
+    ordered = sorted(read_latencies) or [0.0]
+    return {
+        "writes_per_s": writers * logs_per_writer / elapsed,
+        "reads": len(read_latencies),
+        "read_p50": statistics.median(ordered),
+        "read_p99": ordered[max(0, int(len(ordered) * 0.99) - 1)],
+        "read_max": ordered[-1],
+        "errors": len(errors),
+    }
+
+
+def main():
+    """Run the SQLite profile benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--logs", type=int, default=250, help="Log lines per writer")
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"\n{args.writers} writers x {args.logs} log commits, {args.readers} concurrent /runs/{{id}} readers")
+    for profile in ("default", "performance"):
+        r = asyncio.run(measure(profile, args.writers, args.logs, args.readers))
+        print(
+            f"{profile:<12} writes={r['writes_per_s']:8.1f}/s reads={r['reads']:6d} "
+            f"p50={r['read_p50']:7.1f}ms p99={r['read_p99']:7.1f}ms max={r['read_max']:7.1f}ms "
+            f"errors={r['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
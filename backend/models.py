@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional, Dict, Any
-from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, JSON, Index
+from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, JSON, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -22,12 +22,15 @@ class Run(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     canceled = Column(Boolean, default=False, nullable=False)
     request_id = Column(String(36), nullable=True)  # Optional client-provided idempotency key
+    build_hash = Column(String(64), nullable=True)  # Fingerprint of prompt + settings for coalescing
+    archived_at = Column(DateTime(timezone=True), nullable=True)  # Logs/diffs moved to an archive segment
     
     # Indices for common queries
     __table_args__ = (
         Index("idx_runs_status", "status"),
         Index("idx_runs_created_at", "created_at"),
         Index("idx_runs_request_id", "request_id"),
+        Index("idx_runs_build_hash_status", "build_hash", "status"),
     )
 
 
@@ -41,10 +44,14 @@ class RunLog(Base):
     level = Column(String(10), nullable=False, default="info")  # info, warn, error
     message = Column(Text, nullable=False)
     
-    # Indices for efficient querying
+    # Indices for efficient querying; (run_id, id) serves per-run lookups,
+    # newest-first reads and keyset pagination
+    # AUTOINCREMENT on SQLite: ids are log cursors and must never be reused
+    # after archived rows are deleted
     __table_args__ = (
-        Index("idx_run_logs_run_id", "run_id"),
+        Index("idx_run_logs_run_id_id", "run_id", "id"),
         Index("idx_run_logs_ts", "ts"),
+        {"sqlite_autoincrement": True},
     )
 
 
@@ -55,29 +62,48 @@ class RunDiff(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     run_id = Column(String(36), nullable=False)
     idx = Column(Integer, nullable=False)  # Order of diff in the run
-    content_json = Column(JSON, nullable=False)  # Diff content as JSON
+    content_json = Column(JSON, nullable=False)  # Diff as JSON; without "content" when blob_hash is set
+    blob_hash = Column(String(64), nullable=True)  # SHA-256 of the file content in diff_blobs
     
     # Indices for efficient querying
     __table_args__ = (
         Index("idx_run_diffs_run_id", "run_id"),
         Index("idx_run_diffs_run_id_idx", "run_id", "idx"),
+        Index("idx_run_diffs_blob_hash", "blob_hash"),
     )
 
 
+class DiffBlob(Base):
+    """Content-addressed file contents referenced by run diffs."""
+    __tablename__ = "diff_blobs"
+    
+    hash = Column(String(64), primary_key=True)  # SHA-256 of the uncompressed content
+    encoding = Column(String(10), nullable=False, default="identity")  # identity, zlib
+    size = Column(Integer, nullable=False)  # Uncompressed size in bytes
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Also bumped on reuse
+
+
 class QueueItem(Base):
     """Queue items for async processing."""
     __tablename__ = "queue_items"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     run_id = Column(String(36), nullable=False, unique=True)
+    priority = Column(String(10), nullable=False, default="normal", server_default="normal")  # high, normal, low
+    tenant = Column(String(64), nullable=False, default="default", server_default="default")  # Owner for fair scheduling
     enqueued_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     picked_at = Column(DateTime(timezone=True), nullable=True)
     done_at = Column(DateTime(timezone=True), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Renewed by worker heartbeats
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Indices for queue processing
     __table_args__ = (
         Index("idx_queue_enqueued_at", "enqueued_at"),
         Index("idx_queue_picked_at", "picked_at"),
+        Index("idx_queue_lease_expires_at", "lease_expires_at"),
+        Index("idx_queue_priority_tenant", "priority", "tenant", "enqueued_at"),
     )
 
 
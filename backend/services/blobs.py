@@ -0,0 +1,136 @@
+"""Content-addressed storage of diff file contents."""
+
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models import DiffBlob, RunDiff
+
+# Contents below this size aren't worth a compression attempt
+COMPRESS_MIN_BYTES = 256
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of ``content`` encoded as UTF-8."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def encode_blob(content: str) -> Tuple[str, bytes]:
+    """Return (encoding, data), compressing with zlib when that saves space."""
+    raw = content.encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return "zlib", packed
+    return "identity", raw
+
+
+def decode_blob(encoding: str, data: bytes) -> str:
+    """Inverse of encode_blob()."""
+    if encoding == "zlib":
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
+
+def split_diff(diff: Any) -> Tuple[Any, Optional[str], Optional[str]]:
+    """
+    Split a ``{path, content, ...}`` diff into (reference, hash, content).
+
+    Diffs without a string ``content`` are stored whole and get no hash.
+    """
+    if not isinstance(diff, dict) or not isinstance(diff.get("content"), str):
+        return diff, None, None
+    content = diff["content"]
+    reference = {key: value for key, value in diff.items() if key != "content"}
+    return reference, content_hash(content), content
+
+
+def store_diffs(db: Session, run_id: str, diffs: List[Any]) -> None:
+    """
+    Add a run's diffs to the session, storing each file content once.
+
+    Only blobs not already present are inserted; the caller commits. Blobs
+    that exist are touched instead: the UPDATE locks their rows (on SQLite,
+    takes the write lock) until the commit and restarts their garbage
+    collection grace period, so collect_garbage() can't delete a blob the
+    new diffs are about to reference. A blob deleted just before is no
+    longer returned by the UPDATE and is inserted again.
+    """
+    parts = [split_diff(diff) for diff in diffs]
+    contents = {digest: content for _, digest, content in parts if digest}
+
+    if contents:
+        existing = set(db.scalars(
+            update(DiffBlob).where(DiffBlob.hash.in_(list(contents))).values(
+                created_at=func.now()
+            ).returning(DiffBlob.hash),
+            execution_options={"synchronize_session": False}
+        ))
+        rows = []
+        for digest, content in contents.items():
+            if digest in existing:
+                continue
+            encoding, data = encode_blob(content)
+            rows.append({"hash": digest, "encoding": encoding, "size": len(content.encode("utf-8")), "data": data})
+        if rows:
+            db.execute(_insert_missing(db), rows)
+
+    db.add_all([
+        RunDiff(run_id=run_id, idx=idx, content_json=reference, blob_hash=digest)
+        for idx, (reference, digest, _) in enumerate(parts)
+    ])
+
+
+def _insert_missing(db: Session):
+    """INSERT into diff_blobs that skips hashes another writer added concurrently."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(DiffBlob).on_conflict_do_nothing(index_elements=["hash"])
+    if dialect == "postgresql":
+        return pg_insert(DiffBlob).on_conflict_do_nothing(index_elements=["hash"])
+    return insert(DiffBlob)
+
+
+def diffs_query(run_id: str):
+    """Select a run's diffs with their blob (if any) in one round trip, in order."""
+    return select(
+        RunDiff.content_json, RunDiff.blob_hash, DiffBlob.encoding, DiffBlob.data
+    ).outerjoin(DiffBlob, DiffBlob.hash == RunDiff.blob_hash).where(
+        RunDiff.run_id == run_id
+    ).order_by(RunDiff.idx)
+
+
+def assemble_diffs(rows: Iterable[Any]) -> List[Any]:
+    """Rebuild full diffs from diffs_query() rows."""
+    diffs = []
+    for content_json, blob_hash, encoding, data in rows:
+        if blob_hash is None:
+            diffs.append(content_json)
+        elif data is None:
+            # Should not happen; keep the reference rather than failing the request
+            diffs.append({**content_json, "content": None, "blob_hash": blob_hash})
+        else:
+            diffs.append({**content_json, "content": decode_blob(encoding, data)})
+    return diffs
+
+
+def collect_garbage(db: Session, grace: timedelta = timedelta(hours=1)) -> int:
+    """Delete blobs no diff references that weren't stored or reused within ``grace``; returns the count."""
+    referenced = select(RunDiff.blob_hash).where(RunDiff.blob_hash.isnot(None))
+    result = db.execute(
+        delete(DiffBlob).where(
+            and_(
+                DiffBlob.hash.not_in(referenced),
+                DiffBlob.created_at < datetime.utcnow() - grace
+            )
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
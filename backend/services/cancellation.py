@@ -0,0 +1,86 @@
+"""Cooperative cancellation tokens threaded through the build pipeline."""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+# How often in-flight async work re-checks its token
+POLL_INTERVAL = 0.1
+
+
+class RunCanceled(Exception):
+    """Raised inside the pipeline when its run has been canceled."""
+    pass
+
+
+class CancellationToken:
+    """
+    Flag shared between the queue worker and a running pipeline.
+
+    Backed by a ``threading.Event`` by default. For process-pool pipelines the
+    executor passes a multiprocessing manager Event instead, which pickles
+    across the process boundary and exposes the same interface; every call on
+    it is an IPC round-trip, so code on the event loop uses the ``*_async``
+    methods.
+    """
+
+    def __init__(self, event: Optional[Any] = None):
+        self._event = event if event is not None else threading.Event()
+        self.remote = event is not None
+
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+
+    def is_canceled(self) -> bool:
+        """Check whether cancellation was requested."""
+        return self._event.is_set()
+
+    async def cancel_async(self) -> None:
+        """cancel() for the event loop: a remote flag is set on a worker thread."""
+        if self.remote:
+            await asyncio.to_thread(self._event.set)
+        else:
+            self._event.set()
+
+    async def is_canceled_async(self) -> bool:
+        """is_canceled() for the event loop: a remote flag is read on a worker thread."""
+        if self.remote:
+            return await asyncio.to_thread(self._event.is_set)
+        return self._event.is_set()
+
+    def raise_if_canceled(self) -> None:
+        """Raise RunCanceled if cancellation was requested."""
+        if self.is_canceled():
+            raise RunCanceled("Run was canceled")
+
+
+async def run_cancellable(awaitable: Awaitable[Any], token: Optional[CancellationToken]) -> Any:
+    """
+    Await ``awaitable``, aborting it if ``token`` is canceled.
+
+    The awaitable runs as a task that is cancelled once the token fires, which
+    closes any in-flight HTTP request it is awaiting.
+
+    Raises:
+        RunCanceled: If the token was canceled before the awaitable finished
+    """
+    if token is None:
+        return await awaitable
+
+    token.raise_if_canceled()
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=POLL_INTERVAL)
+            if done:
+                return task.result()
+            if token.is_canceled():
+                raise RunCanceled("Run was canceled")
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
@@ -0,0 +1,55 @@
+"""Coalescing of identical build requests onto one in-flight run."""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import Run, RunStatus
+
+# Duplicates only attach to runs that haven't produced a result yet
+INFLIGHT_STATUSES = [RunStatus.QUEUED, RunStatus.RUNNING]
+
+# Settings that only affect scheduling, not what the pipeline builds
+SCHEDULING_KEYS = {"priority"}
+
+COALESCING_ENABLED = os.getenv("BUILD_COALESCING", "true").lower() == "true"
+
+
+def build_fingerprint(prompt: str, settings: Optional[Dict[str, Any]]) -> str:
+    """
+    Hash a build request so that equivalent requests collide.
+
+    The prompt is stripped and its whitespace collapsed; settings are
+    serialized with sorted keys, without scheduling-only fields. The tenant is
+    kept, so runs are never shared between owners.
+    """
+    normalized_prompt = " ".join(prompt.split())
+    normalized_settings = {
+        key: value for key, value in (settings or {}).items()
+        if key not in SCHEDULING_KEYS and value is not None
+    }
+    payload = json.dumps(
+        {"prompt": normalized_prompt, "settings": normalized_settings},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def find_inflight_duplicates(db: Session, fingerprints: Iterable[str]) -> Dict[str, Run]:
+    """Return the oldest queued or running run for each fingerprint that has one, in one query."""
+    fingerprints = set(fingerprints)
+    if not fingerprints:
+        return {}
+    runs = db.query(Run).filter(
+        Run.build_hash.in_(fingerprints),
+        Run.status.in_(INFLIGHT_STATUSES),
+        Run.canceled == False  # noqa: E712
+    ).order_by(Run.created_at).all()
+
+    oldest: Dict[str, Run] = {}
+    for run in runs:
+        oldest.setdefault(run.build_hash, run)
+    return oldest
@@ -0,0 +1,80 @@
+"""Adaptive concurrency limit for the queue worker based on model-host health."""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    Fed with the latency and outcome of every LLM call made by finished runs.
+    Each healthy call grows the limit by ``increase / limit`` (about
+    ``increase`` per full round of in-flight runs); a call slower than
+    ``latency_target_ms`` or a failed call multiplies it by
+    ``decrease_factor``. Decreases are rate-limited by ``cooldown`` seconds,
+    because the runs that were in flight when the model host started
+    struggling all report back at once and should count as one signal.
+    """
+
+    def __init__(self, min_limit: int = 1, max_limit: int = 8, initial: Optional[int] = None,
+                 latency_target_ms: float = 30000.0, increase: float = 1.0,
+                 decrease_factor: float = 0.5, cooldown: float = 10.0):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(f"Invalid concurrency bounds: min={min_limit}, max={max_limit}")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_ms = latency_target_ms
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._limit = float(min(max(initial or min_limit, min_limit), max_limit))
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, initial: int = 2) -> "AIMDLimiter":
+        """Build a limiter from WORKER_CONCURRENCY_* environment variables."""
+        return cls(
+            min_limit=int(os.getenv("WORKER_CONCURRENCY_MIN", "1")),
+            max_limit=int(os.getenv("WORKER_CONCURRENCY_MAX", "8")),
+            initial=initial,
+            latency_target_ms=float(os.getenv("WORKER_LATENCY_TARGET_MS", "30000")),
+        )
+
+    @property
+    def limit(self) -> int:
+        """Current number of runs allowed in flight."""
+        return int(self._limit)
+
+    def record(self, latency_ms: Optional[float], ok: bool) -> None:
+        """Feed one LLM call observation into the limit."""
+        with self._lock:
+            overloaded = not ok or (latency_ms is not None and latency_ms > self.latency_target_ms)
+            previous = self.limit
+
+            if overloaded:
+                now = time.monotonic()
+                if now - self._last_decrease < self.cooldown:
+                    return
+                self._last_decrease = now
+                self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+            else:
+                self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+
+            if self.limit != previous:
+                logger.info(f"Adaptive concurrency limit {previous} -> {self.limit} "
+                            f"(latency={latency_ms}ms, ok={ok})")
+
+
+def limiter_from_env(initial: int) -> Optional[AIMDLimiter]:
+    """Adaptive limiter when WORKER_ADAPTIVE_CONCURRENCY=true, else None (fixed limit)."""
+    if os.getenv("WORKER_ADAPTIVE_CONCURRENCY", "false").lower() != "true":
+        return None
+    return AIMDLimiter.from_env(initial=initial)
@@ -0,0 +1,122 @@
+"""In-memory run and queue counters for constant-time health and metrics."""
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+
+from ..models import Run, QueueItem, RunStatus
+
+logger = logging.getLogger(__name__)
+
+ALL_STATUSES = [
+    RunStatus.QUEUED, RunStatus.RUNNING, RunStatus.NEEDS_APPROVAL, RunStatus.APPROVED,
+    RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELED,
+]
+QUEUE_STATES = ["queued", "processing", "done"]
+
+_PENDING_KEY = "counter_deltas"
+
+
+class RunCounters:
+    """
+    Process-local counts of runs by status and queue items by state.
+
+    Writers record deltas against the session that makes the change; they are
+    applied when that session commits and dropped if it rolls back, so the
+    counters only ever reflect committed state. Changes made by other
+    processes (workers, API replicas) are picked up by reconcile(), which
+    replaces the counters with fresh database counts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Counter = Counter()
+        self._queue: Counter = Counter()
+        self.reconciled_at: Optional[datetime] = None
+
+    def record(self, db: Session, runs: Optional[Dict[str, int]] = None,
+               queue: Optional[Dict[str, int]] = None) -> None:
+        """Record deltas to apply when ``db`` commits."""
+        pending = db.info.setdefault(_PENDING_KEY, [])
+        pending.append((runs or {}, queue or {}))
+
+    def record_transition(self, db: Session, from_status: str, to_status: str, count: int = 1) -> None:
+        """Record ``count`` runs moving between statuses."""
+        if from_status != to_status and count:
+            self.record(db, runs={from_status: -count, to_status: count})
+
+    def _apply(self, pending: list) -> None:
+        with self._lock:
+            for runs, queue in pending:
+                self._runs.update(runs)
+                self._queue.update(queue)
+
+    def runs_by_status(self) -> Dict[str, int]:
+        """Current run counts for every status."""
+        with self._lock:
+            return {status: max(self._runs[status], 0) for status in ALL_STATUSES}
+
+    def queue_status(self) -> Dict[str, int]:
+        """Current queue item counts by state."""
+        with self._lock:
+            return {state: max(self._queue[state], 0) for state in QUEUE_STATES}
+
+    def reconcile(self, db: Session) -> None:
+        """Replace the counters with exact counts from the database."""
+        runs = Counter(dict(db.query(Run.status, func.count(Run.id)).group_by(Run.status).all()))
+
+        picked = QueueItem.picked_at.isnot(None)
+        done = QueueItem.done_at.isnot(None)
+        row = db.query(
+            func.sum(case((~picked & ~done, 1), else_=0)),
+            func.sum(case((picked & ~done, 1), else_=0)),
+            func.sum(case((done, 1), else_=0)),
+        ).one()
+        queue = Counter({state: int(value or 0) for state, value in zip(QUEUE_STATES, row)})
+
+        with self._lock:
+            self._runs = runs
+            self._queue = queue
+            self.reconciled_at = datetime.utcnow()
+
+
+run_counters = RunCounters()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_counter_deltas(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        run_counters._apply(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_counter_deltas(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def reconcile_periodically(session_factory, interval: float,
+                                 stop_event: asyncio.Event) -> None:
+    """
+    Reconcile ``run_counters`` with the database every ``interval`` seconds until stopped.
+    
+    ``session_factory`` must produce AsyncSessions, so the counts don't block
+    the event loop.
+    """
+    while not stop_event.is_set():
+        try:
+            async with session_factory() as db:
+                await db.run_sync(run_counters.reconcile)
+        except Exception as e:
+            logger.warning(f"Counter reconciliation failed: {e}")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -1,37 +1,212 @@
-"""Database engine and session utilities for SQLite persistence."""
+"""Database engine and session utilities (SQLite by default, or PostgreSQL)."""
 
 import logging
 import os
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from ..models import Base
 
 logger = logging.getLogger(__name__)
 
-# Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/app.db")
 
-# Ensure data directory exists
-os.makedirs(os.path.dirname(DATABASE_URL.replace("sqlite:///", "")), exist_ok=True)
+def normalize_url(url: str) -> str:
+    """
+    Pin PostgreSQL URLs without a driver to psycopg (3).
+    
+    Also accepts the ``postgres://`` scheme used by hosted providers. SQLAlchemy
+    2.0 would resolve a bare ``postgresql://`` to psycopg2, which isn't installed.
+    """
+    for scheme in ("postgres://", "postgresql://"):
+        if url.startswith(scheme):
+            return "postgresql+psycopg://" + url[len(scheme):]
+    return url
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    echo=os.getenv("DB_ECHO", "false").lower() == "true",
-    pool_pre_ping=True,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
 
-# Session maker
+# Database configuration
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL", "sqlite:///./data/app.db"))
+
+# Ensure the data directory of a SQLite file database exists
+if DATABASE_URL.startswith("sqlite:///") and ":memory:" not in DATABASE_URL:
+    os.makedirs(os.path.dirname(DATABASE_URL.replace("sqlite:///", "")) or ".", exist_ok=True)
+
+# SQLite connection profile: "performance" (default) applies the pragmas
+# below on every new connection, "default" leaves SQLite's own settings
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+
+# WAL lets readers proceed while a writer commits and only fsyncs the log at
+# checkpoints when combined with synchronous=NORMAL (durable against process
+# crashes; the last commits may be lost on power failure).
+SQLITE_PERFORMANCE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB rather than pages
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PERFORMANCE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str, profile: str = SQLITE_PROFILE) -> Engine:
+    """
+    Create an engine for ``url``.
+    
+    SQLite file databases use a QueuePool sized for the API threadpool plus
+    the queue worker; connections are reused across threads, so
+    check_same_thread is off. In-memory databases get a StaticPool, since each
+    new connection would otherwise see a different empty database.
+    
+    PostgreSQL sessions are pinned to UTC: timestamps are written as naive
+    UTC (datetime.utcnow()) and would otherwise be read in the server's
+    TimeZone when compared with timestamptz columns.
+    """
+    echo = os.getenv("DB_ECHO", "false").lower() == "true"
+    if not url.startswith("sqlite"):
+        connect_args = {"options": "-c timezone=UTC"} if url.startswith("postgresql") else {}
+        return create_engine(url, echo=echo, pool_pre_ping=True, connect_args=connect_args, **_server_pool_args())
+    
+    connect_args = {"check_same_thread": False}
+    if ":memory:" in url or url in ("sqlite://", "sqlite:///"):
+        db_engine = create_engine(url, echo=echo, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        db_engine = create_engine(
+            url,
+            echo=echo,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=30,
+        )
+    
+    if profile == "performance":
+        event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+
+def _server_pool_args() -> dict:
+    """Pool sizing for database servers; every API process and worker holds its own pool."""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": 30,
+    }
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (aiosqlite, asyncpg)."""
+    url = normalize_url(url)
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("sqlite+pysqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite+pysqlite:"):]
+    if url.startswith(("postgresql:", "postgresql+psycopg:", "postgresql+psycopg2:")):
+        async_url = make_url("postgresql+asyncpg:" + url.split(":", 1)[1])
+        # asyncpg takes ``ssl`` where libpq takes ``sslmode``
+        if "sslmode" in async_url.query:
+            query = dict(async_url.query)
+            query["ssl"] = query.pop("sslmode")
+            async_url = async_url.set(query=query)
+        return async_url.render_as_string(hide_password=False)
+    return url
+
+
+def create_async_db_engine(url: str, profile: str = SQLITE_PROFILE) -> AsyncEngine:
+    """
+    Create an asyncio engine for ``url`` with the same SQLite profile.
+    
+    aiosqlite runs each connection on its own thread, so queries awaited on
+    this engine never block the event loop.
+    """
+    echo = os.getenv("DB_ECHO", "false").lower() == "true"
+    async_url = to_async_url(url)
+    if not async_url.startswith("sqlite"):
+        connect_args = {"server_settings": {"timezone": "UTC"}} if async_url.startswith("postgresql+asyncpg") else {}
+        return create_async_engine(
+            async_url, echo=echo, pool_pre_ping=True, connect_args=connect_args, **_server_pool_args()
+        )
+    
+    if ":memory:" in async_url or async_url.endswith("://"):
+        db_engine = create_async_engine(async_url, echo=echo, poolclass=StaticPool)
+    else:
+        db_engine = create_async_engine(
+            async_url,
+            echo=echo,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=30,
+        )
+    
+    if profile == "performance":
+        event.listen(db_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+
+# Create engines: sync for the pipeline threads and admin paths, async for
+# the queue worker and request handlers running on the event loop
+engine = create_db_engine(DATABASE_URL)
+async_engine = create_async_db_engine(DATABASE_URL)
+
+# Session makers
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 def create_tables() -> None:
     """Create all tables if they don't exist."""
     Base.metadata.create_all(bind=engine)
+    _upgrade_existing_tables()
+
+
+def _upgrade_existing_tables() -> None:
+    """
+    Add columns and indices introduced after a table was first created.
+    
+    create_all() skips tables that already exist, so database files created by
+    older versions would otherwise miss newer columns. Only additive changes
+    are handled; new columns must be nullable or carry a server_default.
+    """
+    inspector = inspect(engine)
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    if isinstance(default, str):
+                        default = "'" + default.replace("'", "''") + "'"
+                    else:
+                        default = str(default.text)
+                    ddl += f" DEFAULT {default}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                
+                conn.execute(text(ddl))
+                logger.info(f"Added column {table.name}.{column.name}")
+            
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -43,21 +218,30 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def check_db_health() -> bool:
-    """Check if database is accessible and writable."""
+    """Check that the database answers queries against the schema (read-only)."""
     try:
-        with engine.begin() as conn:
-            # Test read
-            result = conn.execute(text("SELECT 1"))
-            result.fetchone()
-            
-            # Test write (create a temporary table)
-            conn.execute(text("CREATE TEMPORARY TABLE health_check (id INTEGER)"))
-            conn.execute(text("INSERT INTO health_check VALUES (1)"))
-            conn.execute(text("SELECT id FROM health_check"))
-            conn.execute(text("DROP TABLE health_check"))
-            
-            # Transaction commits automatically when exiting 'with' block
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1")).fetchone()
+            conn.execute(text("SELECT 1 FROM runs LIMIT 1")).fetchall()
+            return True
+    except Exception as e:
+        logger.warning(f"Database health check failed: {e}", exc_info=True)
+        return False
+
+
+async def check_db_health_async() -> bool:
+    """Async variant of check_db_health() that doesn't block the event loop."""
+    try:
+        async with async_engine.connect() as conn:
+            (await conn.execute(text("SELECT 1"))).fetchone()
+            (await conn.execute(text("SELECT 1 FROM runs LIMIT 1"))).fetchall()
             return True
     except Exception as e:
         logger.warning(f"Database health check failed: {e}", exc_info=True)
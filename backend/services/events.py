@@ -0,0 +1,156 @@
+"""In-process pub/sub of run status changes and log lines."""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "run_events"
+
+# Event types
+STATUS = "status"
+LOG = "log"
+
+
+class Subscription:
+    """
+    Events of one run for one consumer.
+
+    Holds at most ``max_pending`` events; beyond that new events are dropped
+    and ``overflowed`` is set, so the consumer can resynchronize from the
+    database instead of silently missing lines.
+    """
+
+    def __init__(self, bus: "RunEventBus", run_id: str, max_pending: int):
+        self.bus = bus
+        self.run_id = run_id
+        self.overflowed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def _put(self, item: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None if none arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def get_nowait(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def close(self) -> None:
+        self.bus._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class RunEventBus:
+    """
+    Fans out run events to subscribers on the event loop.
+
+    Writers record events against the session that makes the change with
+    record(); they are published when that session commits and dropped if it
+    rolls back, so subscribers never see uncommitted state. publish() is safe
+    to call from any thread (threadpool handlers, retention) and hands the
+    event to the loop that bind() was called on.
+
+    Only changes made in this process are seen; streams resynchronize from
+    the database periodically to pick up changes made by external workers.
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Deliver events on ``loop`` (the running loop by default)."""
+        self._loop = loop or asyncio.get_running_loop()
+
+    def subscribe(self, run_id: str) -> Subscription:
+        """Start receiving ``run_id``'s events; must be called on the bound loop."""
+        if self._loop is None:
+            self.bind()
+        subscription = Subscription(self, run_id, self.max_pending)
+        with self._lock:
+            self._subscribers[run_id].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.run_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.run_id]
+
+    def has_subscribers(self, run_id: str) -> bool:
+        return run_id in self._subscribers
+
+    def record(self, db: Session, run_id: str, event_type: str, data: Dict[str, Any]) -> None:
+        """Publish an event when ``db`` commits."""
+        db.info.setdefault(_PENDING_KEY, []).append((run_id, event_type, data))
+
+    def publish(self, run_id: str, event_type: str, data: Dict[str, Any]) -> None:
+        """Deliver an event to ``run_id``'s subscribers. Safe to call from any thread."""
+        if run_id not in self._subscribers:
+            return
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        item = {"type": event_type, "data": data}
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is loop:
+            self._deliver(run_id, item)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._deliver, run_id, item)
+            except RuntimeError:
+                # Loop closed during shutdown
+                pass
+
+    def _deliver(self, run_id: str, item: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(run_id, ()))
+        for subscription in subscribers:
+            subscription._put(item)
+
+
+# Global bus fed by the state manager, the queue worker and the log sink
+run_events = RunEventBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for run_id, event_type, data in pending or ():
+        run_events.publish(run_id, event_type, data)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_events(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
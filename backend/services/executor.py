@@ -0,0 +1,158 @@
+"""Configurable executors for running build pipelines off the event loop."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from .cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineTimeout(Exception):
+    """Raised when a pipeline run exceeds the configured per-run timeout."""
+    pass
+
+
+class PipelineExecutor:
+    """
+    Runs pipeline callables on a bounded thread pool or a process pool.
+
+    Process mode keeps CPU-heavy pipeline work (JSON parsing, embeddings, diff
+    handling) off the API interpreter's GIL. Pool processes are recycled after
+    ``max_runs_per_worker`` runs to bound memory growth, and a run that exceeds
+    ``run_timeout`` fails with PipelineTimeout. A timed-out run cannot be
+    interrupted in place, so in process mode its pool is retired: new runs go
+    to a fresh pool and the stuck process is terminated once the retired
+    pool's other runs have finished.
+    """
+
+    MODES = {"thread", "process"}
+
+    def __init__(self, mode: str = "thread", max_workers: int = 2,
+                 max_runs_per_worker: Optional[int] = None,
+                 run_timeout: Optional[float] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown pipeline executor mode '{mode}', expected one of {sorted(self.MODES)}")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_runs_per_worker = max_runs_per_worker
+        self.run_timeout = run_timeout
+        self._pool: Optional[Executor] = None
+        self._in_flight: Dict[Executor, Set[Future]] = {}
+        self._manager = None
+        self._manager_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, default_workers: int = 2) -> "PipelineExecutor":
+        """Build an executor from PIPELINE_* environment variables."""
+        max_runs = int(os.getenv("PIPELINE_MAX_RUNS_PER_WORKER", "50"))
+        timeout = float(os.getenv("PIPELINE_RUN_TIMEOUT", "1800"))
+        return cls(
+            mode=os.getenv("PIPELINE_EXECUTOR", "process").lower(),
+            max_workers=int(os.getenv("PIPELINE_MAX_WORKERS", str(default_workers))),
+            max_runs_per_worker=max_runs if max_runs > 0 else None,
+            run_timeout=timeout if timeout > 0 else None,
+        )
+
+    def _get_pool(self) -> Executor:
+        """Return the active pool, creating it on first use."""
+        if self._pool is None:
+            if self.mode == "process":
+                # spawn: forking a process that runs an event loop and DB
+                # connections is unsafe, and max_tasks_per_child requires it
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_runs_per_worker,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="pipeline",
+                )
+            self._in_flight[self._pool] = set()
+        return self._pool
+
+    async def start(self) -> None:
+        """Start the token manager process (process mode) without blocking the event loop."""
+        if self.mode == "process":
+            await asyncio.to_thread(self._get_manager)
+
+    def _get_manager(self):
+        # Spawning the manager takes hundreds of milliseconds
+        with self._manager_lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager
+
+    def new_token(self) -> CancellationToken:
+        """Create a cancellation token usable by pipelines on this executor."""
+        if self.mode == "process":
+            # Plain threading.Events don't cross process boundaries; manager
+            # Events are picklable proxies served from a helper process
+            return CancellationToken(self._get_manager().Event())
+        return CancellationToken()
+
+    async def new_token_async(self) -> CancellationToken:
+        """new_token() for the event loop: manager round-trips run on a worker thread."""
+        if self.mode == "process":
+            return await asyncio.to_thread(self.new_token)
+        return self.new_token()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool, enforcing the per-run timeout."""
+        pool = self._get_pool()
+        future = pool.submit(fn, *args)
+        in_flight = self._in_flight[pool]
+        in_flight.add(future)
+        future.add_done_callback(in_flight.discard)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.run_timeout)
+        except asyncio.TimeoutError:
+            # Stop tracking the stuck run so reaping only waits for healthy ones
+            future.cancel()
+            in_flight.discard(future)
+            if self.mode == "process" and pool is self._pool:
+                self._retire_pool()
+            raise PipelineTimeout(f"Pipeline run exceeded {self.run_timeout}s timeout")
+
+    def _retire_pool(self) -> None:
+        """Stop routing runs to the current process pool and reap it in the background."""
+        pool = self._pool
+        self._pool = None
+        if pool is None:
+            return
+
+        logger.warning("Retiring pipeline process pool after a run timed out")
+        # Snapshot the worker processes now; shutdown() drops the reference
+        processes = list(getattr(pool, "_processes", {}).values())
+        pool.shutdown(wait=False)
+        asyncio.get_running_loop().create_task(self._reap_pool(pool, processes))
+
+    async def _reap_pool(self, pool: Executor, processes: list) -> None:
+        """Terminate a retired pool's processes once its healthy runs have finished."""
+        while any(not f.done() for f in self._in_flight.get(pool, ())):
+            await asyncio.sleep(1.0)
+
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        self._in_flight.pop(pool, None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the active pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._in_flight.pop(self._pool, None)
+            self._pool = None
+        with self._manager_lock:
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
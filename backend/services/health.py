@@ -0,0 +1,88 @@
+"""Background database health monitor serving cached probe results."""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .db import check_db_health_async
+
+logger = logging.getLogger(__name__)
+
+
+class DbHealthMonitor:
+    """
+    Probes the database every ``interval`` seconds and caches the outcome.
+
+    Health endpoints answer from the cache, so frequent probing costs no
+    database work. A cached result older than ``max_age`` (e.g. because the
+    monitor isn't running) is refreshed by the caller instead.
+    """
+
+    def __init__(self, interval: float = 10.0, max_age: Optional[float] = None):
+        self.interval = interval
+        self.max_age = max_age if max_age is not None else interval * 3
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_monotonic = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_env(cls) -> "DbHealthMonitor":
+        """Build a monitor from DB_HEALTH_INTERVAL (seconds)."""
+        return cls(interval=float(os.getenv("DB_HEALTH_INTERVAL", "10")))
+
+    async def start(self) -> None:
+        """Start probing in the background."""
+        if self._task:
+            return
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self) -> None:
+        """Stop the background probe."""
+        if not self._task:
+            return
+        self._stop_event.set()
+        await self._task
+        self._task = None
+
+    async def probe(self) -> Dict[str, Any]:
+        """Run a real (read-only) probe now and cache its result."""
+        async with self._lock:
+            t0 = time.perf_counter()
+            ok = await check_db_health_async()
+            self._result = {
+                "ok": ok,
+                "checked_at": datetime.utcnow().isoformat(),
+                "latency_ms": round((time.perf_counter() - t0) * 1000.0, 2),
+            }
+            self._checked_monotonic = time.monotonic()
+            return self._result
+
+    async def status(self, deep: bool = False) -> Dict[str, Any]:
+        """Cached probe result; probes now when ``deep`` or when the cache is stale."""
+        if deep or self._result is None or time.monotonic() - self._checked_monotonic > self.max_age:
+            return await self.probe()
+        return self._result
+
+    async def _probe_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                result = await self.probe()
+                if not result["ok"]:
+                    logger.warning("Database health probe failed")
+            except Exception as e:
+                logger.warning(f"Database health probe errored: {e}")
+
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Global monitor used by the health endpoints
+db_health_monitor = DbHealthMonitor.from_env()
@@ -1,8 +1,34 @@
 import os
 import time
+import contextvars
+from contextlib import contextmanager
 import httpx
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from . import agl as agl
+from .cancellation import CancellationToken, run_cancellable
+
+
+# Per-pipeline list of LLM call observations (latency, outcome, tokens). A
+# context variable so concurrent pipelines on a thread pool don't mix, and
+# so asyncio.run() inside the agents still sees the caller's list.
+_call_log: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("llm_call_log", default=None)
+
+
+@contextmanager
+def collect_calls() -> Iterator[List[Dict[str, Any]]]:
+    """Collect observations of every LLM call made inside the block."""
+    calls: List[Dict[str, Any]] = []
+    token = _call_log.set(calls)
+    try:
+        yield calls
+    finally:
+        _call_log.reset(token)
+
+
+def _record_call(provider: str, model: str, latency_ms: float, ok: bool, tokens: Optional[int] = None) -> None:
+    calls = _call_log.get()
+    if calls is not None:
+        calls.append({"provider": provider, "model": model, "latency_ms": latency_ms, "ok": ok, "tokens": tokens})
 
 
 class LLMClient:
@@ -33,6 +59,7 @@ class LLMClient:
             usage = data.get("usage", {})
             tokens = usage.get("total_tokens")
             agl.emit_completion(model=model, output=content, tokens=tokens, latency_ms=latency_ms, meta={"provider": "openai-compatible"})
+            _record_call("openai-compatible", model, latency_ms, ok=True, tokens=tokens)
             return content
 
     async def chat_ollama(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.2) -> str:
@@ -47,25 +74,37 @@ class LLMClient:
             # Ollama returns a streaming-like structure; final message present as 'message'
             if "message" in data and "content" in data["message"]:
                 content = data["message"]["content"]
-                agl.emit_completion(model=model, output=content, tokens=None, latency_ms=(time.perf_counter()-t0)*1000.0, meta={"provider": "ollama"})
+                latency_ms = (time.perf_counter()-t0)*1000.0
+                agl.emit_completion(model=model, output=content, tokens=None, latency_ms=latency_ms, meta={"provider": "ollama"})
+                _record_call("ollama", model, latency_ms, ok=True, tokens=data.get("eval_count"))
                 return content
             # or 'done' events; fallback
             content = data.get("content", "")
-            agl.emit_completion(model=model, output=content, tokens=None, latency_ms=(time.perf_counter()-t0)*1000.0, meta={"provider": "ollama"})
+            latency_ms = (time.perf_counter()-t0)*1000.0
+            agl.emit_completion(model=model, output=content, tokens=None, latency_ms=latency_ms, meta={"provider": "ollama"})
+            _record_call("ollama", model, latency_ms, ok=True, tokens=data.get("eval_count"))
             return content
 
-    async def chat(self, kind: str, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 2048) -> str:
+    async def chat(self, kind: str, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 2048,
+                   cancel_token: Optional[CancellationToken] = None) -> str:
+        # Canceling the token aborts the outstanding HTTP request (raises RunCanceled)
+        return await run_cancellable(self._chat(kind, messages, temperature, max_tokens), cancel_token)
+
+    async def _chat(self, kind: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
         model = self.reasoning_model if kind == "reasoning" else self.coding_model
         # Try vLLM compatible first
         if self.vllm_base:
+            t0 = time.perf_counter()
             try:
                 return await self.chat_openai(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens)
             except Exception:
-                pass
+                _record_call("openai-compatible", model, (time.perf_counter()-t0)*1000.0, ok=False)
         # Fallback to Ollama
+        t0 = time.perf_counter()
         try:
             return await self.chat_ollama(model=model, messages=messages, temperature=temperature)
         except Exception:
+            _record_call("ollama", model, (time.perf_counter()-t0)*1000.0, ok=False)
             # Final fallback stub to keep pipeline moving in shadow mode
             prompt_tail = messages[-1]["content"][-120:] if messages else ""
             return f"[stub] Plan for: {prompt_tail}"
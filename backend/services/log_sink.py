@@ -0,0 +1,221 @@
+"""Buffered run log writer that batches RunLog inserts."""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from ..models import RunLog, LogLevel
+from .db import AsyncSessionLocal, SessionLocal
+from .events import run_events, LOG
+
+logger = logging.getLogger(__name__)
+
+
+class RunLogSink:
+    """
+    Buffers run log lines in memory and writes them with bulk inserts.
+
+    Lines are flushed by a background task on the event loop once
+    ``batch_size`` lines are waiting or ``flush_interval`` seconds have
+    passed, and on stop(). A single FIFO buffer drained by a single flusher
+    keeps the order of lines within each run; timestamps are taken when a
+    line is added, not when it is written. Written lines are published to
+    ``run_events`` with their ids once committed.
+
+    The buffer holds at most ``max_buffered`` lines. When it is full, new
+    lines are dropped rather than blocking the caller (which may be the event
+    loop); drops are counted per run and reported with one warning line per
+    affected run once there is room again.
+
+    add() is safe to call from any thread. Before start() (scripts, tests)
+    each line is written straight away; lines added on an event loop thread
+    are handed to a single writer thread instead, so the loop never waits on
+    the database (SQLite: on a write lock held by its own async session).
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.5,
+                 max_buffered: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.dropped_total = 0
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._dropped: Counter = Counter()
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "RunLogSink":
+        """Build a sink from LOG_SINK_* environment variables."""
+        return cls(
+            batch_size=int(os.getenv("LOG_SINK_BATCH_SIZE", "200")),
+            flush_interval=float(os.getenv("LOG_SINK_FLUSH_INTERVAL", "0.5")),
+            max_buffered=int(os.getenv("LOG_SINK_MAX_BUFFERED", "10000")),
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def add(self, run_id: str, level: str, message: str) -> bool:
+        """
+        Queue a log line for ``run_id``.
+
+        Returns:
+            False if the line was dropped because the buffer is full
+        """
+        row = {"run_id": run_id, "level": level, "message": message, "ts": datetime.utcnow()}
+
+        if not self.running:
+            if _on_event_loop():
+                self._unstarted_writer().submit(self._write_logged, [row])
+            else:
+                self._write_sync([row])
+            return True
+
+        with self._lock:
+            if len(self._buffer) >= self.max_buffered:
+                self._dropped[run_id] += 1
+                self.dropped_total += 1
+                return False
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+
+        if full:
+            self._notify()
+        return True
+
+    async def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flusher after writing everything still buffered."""
+        if not self._task:
+            return
+        self._stopping = True
+        self._notify()
+        await self._task
+        self._task = None
+
+    def _notify(self) -> None:
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Loop already closed during interpreter shutdown
+            pass
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush run logs: {e}", exc_info=True)
+
+            if self._stopping:
+                return
+
+    async def flush(self) -> int:
+        """Write all buffered lines in batches; returns the number written."""
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return written
+            try:
+                async with AsyncSessionLocal() as db:
+                    ids = (await db.execute(_INSERT_RETURNING_IDS, batch)).scalars().all()
+                    await db.commit()
+            except Exception:
+                # Put the batch back in front so ordering survives a retry
+                with self._lock:
+                    self._buffer.extendleft(reversed(batch))
+                raise
+            _publish(batch, ids)
+            written += len(batch)
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if self._dropped and len(self._buffer) + len(batch) < self.max_buffered:
+                now = datetime.utcnow()
+                for run_id, count in self._dropped.items():
+                    batch.append({
+                        "run_id": run_id,
+                        "level": LogLevel.WARN,
+                        "message": f"Dropped {count} log lines: log buffer was full",
+                        "ts": now,
+                    })
+                logger.warning(f"Run log buffer overflowed; dropped {sum(self._dropped.values())} lines")
+                self._dropped.clear()
+        return batch
+
+    def _unstarted_writer(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._writer is None:
+                # One thread keeps the lines in order
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="run-log-writer")
+            return self._writer
+
+    def _write_logged(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            self._write_sync(rows)
+        except Exception as e:
+            logger.error(f"Failed to write run logs: {e}", exc_info=True)
+
+    def _write_sync(self, rows: List[Dict[str, Any]]) -> None:
+        with SessionLocal() as db:
+            ids = db.execute(_INSERT_RETURNING_IDS, rows).scalars().all()
+            db.commit()
+        _publish(rows, ids)
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+# Bulk insert that reports the new ids in the order of the rows
+_INSERT_RETURNING_IDS = insert(RunLog).returning(RunLog.id, sort_by_parameter_order=True)
+
+
+def _publish(rows: List[Dict[str, Any]], ids: List[int]) -> None:
+    for row, log_id in zip(rows, ids):
+        if run_events.has_subscribers(row["run_id"]):
+            run_events.publish(row["run_id"], LOG, {
+                "id": log_id,
+                "ts": row["ts"].isoformat(),
+                "level": row["level"],
+                "message": row["message"],
+            })
+
+
+# Global sink used by the API handlers and the queue worker
+run_log_sink = RunLogSink.from_env()
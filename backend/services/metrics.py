@@ -0,0 +1,134 @@
+"""Prometheus metrics for the queue, pipeline, LLM calls and database."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .counters import run_counters
+from .response_cache import terminal_responses
+
+logger = logging.getLogger(__name__)
+
+registry = CollectorRegistry()
+
+# Runs wait seconds to minutes in the queue and take minutes to run
+_LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+_LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+QUEUE_WAIT = Histogram(
+    "builder_queue_wait_seconds", "Time from enqueue to claim, by the run's final status",
+    ["final_status"], buckets=_LONG_BUCKETS, registry=registry,
+)
+RUN_DURATION = Histogram(
+    "builder_run_duration_seconds", "Time from claim to completion, by final status",
+    ["final_status"], buckets=_LONG_BUCKETS, registry=registry,
+)
+NODE_DURATION = Histogram(
+    "builder_pipeline_node_duration_seconds", "Duration of each pipeline node",
+    ["node"], buckets=_LONG_BUCKETS, registry=registry,
+)
+LLM_LATENCY = Histogram(
+    "builder_llm_request_duration_seconds", "LLM call latency by provider, model and outcome",
+    ["provider", "model", "outcome"], buckets=_LLM_BUCKETS, registry=registry,
+)
+LLM_TOKENS = Counter(
+    "builder_llm_tokens", "Tokens reported by LLM responses, by provider and model",
+    ["provider", "model"], registry=registry,
+)
+DB_COMMIT = Histogram(
+    "builder_db_commit_duration_seconds", "Session commit latency (including the final flush)",
+    buckets=_DB_BUCKETS, registry=registry,
+)
+EVENT_LOOP_LAG = Histogram(
+    "builder_event_loop_lag_seconds", "How late the event loop ran a timer scheduled for now",
+    buckets=_LAG_BUCKETS, registry=registry,
+)
+
+
+class _CounterCollector:
+    """Exposes the in-memory run/queue counters and response cache stats at scrape time."""
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        runs = GaugeMetricFamily("builder_runs", "Runs by status", labels=["status"])
+        for status, count in run_counters.runs_by_status().items():
+            runs.add_metric([status], count)
+        yield runs
+
+        queue = GaugeMetricFamily("builder_queue_items", "Queue items by state", labels=["state"])
+        for state, count in run_counters.queue_status().items():
+            queue.add_metric([state], count)
+        yield queue
+
+        cache = terminal_responses.stats()
+        yield GaugeMetricFamily("builder_response_cache_bytes", "Bytes held by the terminal-run response cache",
+                                value=cache["bytes"])
+        lookups = CounterMetricFamily("builder_response_cache_lookups", "Terminal-run response cache lookups",
+                                      labels=["result"])
+        lookups.add_metric(["hit"], cache["hits"])
+        lookups.add_metric(["miss"], cache["misses"])
+        yield lookups
+
+
+registry.register(_CounterCollector())
+
+
+def render() -> bytes:
+    """Current metrics in the Prometheus text exposition format."""
+    return generate_latest(registry)
+
+
+def observe_run(final_status: str, queue_wait: Optional[float], duration: Optional[float]) -> None:
+    """Record queue wait and run duration (seconds) of a finished run."""
+    if queue_wait is not None and queue_wait >= 0:
+        QUEUE_WAIT.labels(final_status).observe(queue_wait)
+    if duration is not None and duration >= 0:
+        RUN_DURATION.labels(final_status).observe(duration)
+
+
+def observe_pipeline(result: Dict[str, Any]) -> None:
+    """Record node durations and LLM calls reported with a pipeline result."""
+    for node, seconds in (result.get("node_durations") or {}).items():
+        NODE_DURATION.labels(node).observe(seconds)
+
+    for call in result.get("llm_calls") or []:
+        provider = call.get("provider") or "unknown"
+        model = call.get("model") or "unknown"
+        outcome = "ok" if call.get("ok", True) else "error"
+        if call.get("latency_ms") is not None:
+            LLM_LATENCY.labels(provider, model, outcome).observe(call["latency_ms"] / 1000.0)
+        if call.get("tokens"):
+            LLM_TOKENS.labels(provider, model).inc(call["tokens"])
+
+
+async def monitor_event_loop_lag(stop_event: asyncio.Event, interval: float = 0.5) -> None:
+    """Sample event-loop lag every ``interval`` seconds until stopped."""
+    loop = asyncio.get_running_loop()
+    while not stop_event.is_set():
+        expected = loop.time() + interval
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+_COMMIT_STARTED = "metrics_commit_started"
+
+
+@event.listens_for(Session, "before_commit")
+def _commit_started(session: Session) -> None:
+    session.info[_COMMIT_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session: Session) -> None:
+    started = session.info.pop(_COMMIT_STARTED, None)
+    if started is not None:
+        DB_COMMIT.observe(time.perf_counter() - started)
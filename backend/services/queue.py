@@ -4,44 +4,401 @@ import asyncio
 import logging
 import signal
 import time
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
 from contextlib import asynccontextmanager
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_, select, text, update
 
 from ..models import Run, RunLog, QueueItem, RunStatus, LogLevel
-from ..services.db import get_db, SessionLocal
-from ..services.state import RunStateManager, create_run_state_manager
+from ..services.db import get_db, AsyncSessionLocal, async_engine
+from ..services.state import RunStateManager, StatusTransitionValidator, create_run_state_manager
+from ..services.executor import PipelineExecutor, PipelineTimeout
+from ..services.cancellation import CancellationToken
+from ..services.concurrency import AIMDLimiter
+from ..services.counters import run_counters
+from ..services.events import run_events, LOG
+from ..services.log_sink import run_log_sink
+from ..services.blobs import store_diffs
+from ..services.queue_notify import QueueListener, publish_queue_change
+from ..services import metrics
+from ..services.scheduling import (
+    DEFAULT_PRIORITY, DEFAULT_TENANT, QueueCandidate, WeightedFairPolicy,
+    normalize_priority, normalize_tenant
+)
 from ..agents.graph import execute_build
 
 logger = logging.getLogger(__name__)
 
+# How long a claimed item stays invisible to other workers without a heartbeat
+DEFAULT_LEASE_SECONDS = 60.0
+
+# How often in-flight runs check whether they were canceled
+CANCEL_CHECK_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class QueueClaim:
+    """
+    A claimed queue item.
+    
+    ``attempt`` is the item's attempt counter after the claim and fences the
+    claim: renewing, finishing and closing match on it, so a worker whose
+    lease was reaped (and possibly re-claimed elsewhere) can no longer touch
+    the item or its run.
+    """
+    run_id: str
+    attempt: int
+
+
+def _claimed_by(claims: List[QueueClaim]):
+    """WHERE clause matching queue items still held under ``claims``."""
+    return and_(
+        or_(*[
+            and_(QueueItem.run_id == claim.run_id, QueueItem.attempts == claim.attempt)
+            for claim in claims
+        ]),
+        QueueItem.picked_at.isnot(None),
+        QueueItem.done_at.is_(None)
+    )
+
+
+def claim_queue_items(db: Session, limit: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                      policy: Optional[WeightedFairPolicy] = None) -> List[QueueClaim]:
+    """
+    Atomically claim up to ``limit`` queue items and take leases on them.
+    
+    All picks are applied by one conditional ``UPDATE ... RETURNING``
+    statement guarded by ``picked_at IS NULL``, so any number of worker
+    processes can drain the same queue without claiming a run twice, and a
+    burst of runs costs one transaction per batch rather than per run. On
+    PostgreSQL the candidate rows are locked with ``FOR UPDATE SKIP
+    LOCKED`` so concurrent claimers move on to other rows instead of blocking;
+    on SQLite the transaction is opened with ``BEGIN IMMEDIATE`` so claimers
+    serialize on the write lock instead of failing with a lock upgrade error.
+    
+    Args:
+        db: Database session
+        limit: Maximum number of items to claim
+        lease_seconds: Lease duration; the claimer must renew it with
+            renew_lease() or the item is handed back by reap_expired_leases()
+        policy: Dequeue policy choosing among queued items; strict FIFO by
+            ``enqueued_at`` when None
+    
+    Returns:
+        The claims in dequeue order (empty if nothing is eligible)
+    """
+    dialect = db.get_bind().dialect.name
+    
+    # Under a policy another process can win the chosen rows between the
+    # select and the update (not on SQLite, where the claim holds the write
+    # lock throughout); retry with a fresh pick if all of them were lost.
+    attempts = 3 if policy is not None and dialect != "sqlite" else 1
+    
+    try:
+        for _ in range(attempts):
+            now = datetime.utcnow()
+            if dialect == "sqlite":
+                db.execute(text("BEGIN IMMEDIATE"))
+            
+            if policy is None:
+                targets = select(QueueItem.id).where(
+                    and_(
+                        QueueItem.picked_at.is_(None),
+                        QueueItem.done_at.is_(None)
+                    )
+                ).order_by(QueueItem.enqueued_at.asc(), QueueItem.id.asc()).limit(limit)
+                
+                if dialect == "postgresql":
+                    targets = targets.with_for_update(skip_locked=True)
+                order = None
+            else:
+                chosen = policy.select_many(_queue_candidates(db, limit), _running_by_tenant(db), limit)
+                if not chosen:
+                    db.commit()
+                    return []
+                targets = [c.item_id for c in chosen]
+                if dialect == "postgresql":
+                    # Skip picks another claimer is updating right now rather
+                    # than waiting on its row locks
+                    targets = select(QueueItem.id).where(
+                        QueueItem.id.in_(targets)
+                    ).with_for_update(skip_locked=True)
+                order = {c.run_id: position for position, c in enumerate(chosen)}
+            
+            if dialect == "postgresql":
+                # Join a materialized CTE: as ``id IN (subquery)`` PostgreSQL
+                # may re-run the locking subquery per scanned row, claiming
+                # far more than ``limit`` rows
+                locked = targets.cte("claimable").prefix_with("MATERIALIZED")
+                picked = QueueItem.id == locked.c.id
+            else:
+                picked = QueueItem.id.in_(targets)
+            
+            stmt = update(QueueItem).where(
+                and_(
+                    picked,
+                    QueueItem.picked_at.is_(None)
+                )
+            ).values(
+                picked_at=now,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=QueueItem.attempts + 1
+            ).returning(QueueItem.run_id, QueueItem.enqueued_at, QueueItem.id, QueueItem.attempts)
+            
+            rows = db.execute(stmt, execution_options={"synchronize_session": False}).all()
+            run_counters.record(db, queue={"queued": -len(rows), "processing": len(rows)})
+            db.commit()
+            if rows:
+                # RETURNING order is unspecified; restore dequeue order
+                if order is None:
+                    rows.sort(key=lambda row: (row.enqueued_at, row.id))
+                else:
+                    rows.sort(key=lambda row: order[row.run_id])
+                return [QueueClaim(run_id=row.run_id, attempt=row.attempts) for row in rows]
+    except Exception:
+        db.rollback()
+        raise
+    
+    return []
+
+
+def claim_next_queue_item(db: Session, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                          policy: Optional[WeightedFairPolicy] = None) -> Optional[str]:
+    """Atomically claim a single queue item and return its run_id; see claim_queue_items()."""
+    claims = claim_queue_items(db, limit=1, lease_seconds=lease_seconds, policy=policy)
+    return claims[0].run_id if claims else None
+
+
+def _queue_candidates(db: Session, per_group: int) -> Dict[Tuple[str, str], List[QueueCandidate]]:
+    """Return the oldest ``per_group`` queued items of every (priority, tenant) group."""
+    ranked = select(
+        QueueItem.id,
+        QueueItem.run_id,
+        QueueItem.priority,
+        QueueItem.tenant,
+        QueueItem.enqueued_at,
+        func.row_number().over(
+            partition_by=(QueueItem.priority, QueueItem.tenant),
+            order_by=(QueueItem.enqueued_at.asc(), QueueItem.id.asc())
+        ).label("position")
+    ).where(
+        and_(
+            QueueItem.picked_at.is_(None),
+            QueueItem.done_at.is_(None)
+        )
+    ).subquery()
+    
+    rows = db.execute(
+        select(ranked).where(ranked.c.position <= per_group).order_by(ranked.c.position)
+    ).all()
+    
+    queues: Dict[Tuple[str, str], List[QueueCandidate]] = {}
+    for row in rows:
+        queues.setdefault((row.priority, row.tenant), []).append(
+            QueueCandidate(
+                item_id=row.id,
+                run_id=row.run_id,
+                priority=row.priority,
+                tenant=row.tenant,
+                enqueued_at=row.enqueued_at
+            )
+        )
+    return queues
+
+
+def _running_by_tenant(db: Session) -> Dict[str, int]:
+    """Return the number of claimed, unfinished items per tenant across all workers."""
+    rows = db.query(QueueItem.tenant, func.count(QueueItem.id)).filter(
+        and_(
+            QueueItem.picked_at.isnot(None),
+            QueueItem.done_at.is_(None)
+        )
+    ).group_by(QueueItem.tenant).all()
+    return {tenant: count for tenant, count in rows}
+
+
+def renew_lease(db: Session, claim: QueueClaim, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+    """Extend the lease on a claimed queue item. Returns False if the claim was lost."""
+    result = db.execute(
+        update(QueueItem).where(_claimed_by([claim])).values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def reap_expired_leases(db: Session, max_attempts: int) -> Dict[str, int]:
+    """
+    Hand back queue items whose worker stopped heartbeating.
+    
+    Items with attempts left are requeued (their run goes back to QUEUED);
+    items that used up ``max_attempts`` are marked done and their run FAILED.
+    Items whose run already reached a terminal status are simply closed.
+    Each update is conditional on the lease still being expired, so a late
+    heartbeat or a concurrent reaper in another process wins cleanly.
+    
+    Returns:
+        Counts of requeued, failed and closed items
+    """
+    now = datetime.utcnow()
+    counts = {"requeued": 0, "failed": 0, "closed": 0}
+    
+    expired = db.query(QueueItem).filter(
+        and_(
+            QueueItem.picked_at.isnot(None),
+            QueueItem.done_at.is_(None),
+            QueueItem.lease_expires_at < now
+        )
+    ).all()
+    
+    state_manager = create_run_state_manager(db)
+    for item in expired:
+        status = state_manager.get_run_status(item.run_id)
+        
+        if status is None or StatusTransitionValidator.is_terminal_status(status):
+            outcome = "closed"
+            values = {"done_at": now, "lease_expires_at": None}
+        elif item.attempts < max_attempts:
+            outcome = "requeued"
+            values = {"picked_at": None, "lease_expires_at": None}
+        else:
+            outcome = "failed"
+            values = {"done_at": now, "lease_expires_at": None}
+        
+        result = db.execute(
+            update(QueueItem).where(
+                and_(
+                    QueueItem.id == item.id,
+                    QueueItem.done_at.is_(None),
+                    QueueItem.lease_expires_at < now
+                )
+            ).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            continue
+        
+        target_state = "queued" if outcome == "requeued" else "done"
+        run_counters.record(db, queue={"processing": -1, target_state: 1})
+        
+        # Closed items belong to runs that already finished; nothing to log for them
+        level = message = None
+        if outcome == "requeued":
+            level = LogLevel.WARN
+            message = f"Worker lease expired; requeued (attempt {item.attempts} of {max_attempts})"
+            publish_queue_change(db)
+            if status == RunStatus.RUNNING:
+                state_manager.transition_status(item.run_id, RunStatus.QUEUED)
+        elif outcome == "failed":
+            level = LogLevel.ERROR
+            message = f"Worker lease expired after {item.attempts} attempts; giving up"
+            state_manager.transition_status(item.run_id, RunStatus.FAILED)
+        
+        # transition_status commits too; this covers the status-less cases
+        db.commit()
+        if message:
+            run_log_sink.add(item.run_id, level, message)
+        counts[outcome] += 1
+        logger.warning(f"Reaped expired lease for run {item.run_id}: {outcome}")
+    
+    return counts
+
+
+def _seconds_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    # SQLite hands back naive UTC datetimes; compare everything as naive UTC
+    if start.tzinfo:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end.tzinfo:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    return (end - start).total_seconds()
+
 
 class QueueWorker:
     """Single-consumer async queue worker with backpressure and graceful shutdown."""
     
-    def __init__(self, max_concurrent: int = 2, poll_interval: float = 1.0):
+    def __init__(self, max_concurrent: int = 2, poll_interval: float = 30.0,
+                 install_signal_handlers: bool = False,
+                 executor: Optional[PipelineExecutor] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = 3,
+                 policy: Optional[WeightedFairPolicy] = None,
+                 claim_batch_size: int = 16,
+                 limiter: Optional[AIMDLimiter] = None,
+                 drain_timeout: float = 30.0):
         self.max_concurrent = max_concurrent
+        # Optional adaptive limit driven by model-host latency and errors;
+        # replaces the fixed max_concurrent when set
+        self.limiter = limiter
+        # Upper bound on runs claimed per transaction (also bounded by free slots)
+        self.claim_batch_size = claim_batch_size
+        # Weighted fair dequeue across priority classes and tenants
+        self.policy = policy or WeightedFairPolicy.from_env()
+        # Pipelines run on a dedicated pool (a process pool by default) so
+        # build CPU work doesn't compete with the event loop serving HTTP
+        self.executor = executor or PipelineExecutor.from_env(
+            default_workers=limiter.max_limit if limiter else max_concurrent
+        )
+        # Enqueues and task completions wake the loop directly via notify();
+        # polling only remains as a slow safety net.
         self.poll_interval = poll_interval
+        # Claimed items are leased; _process_run heartbeats every third of the
+        # lease and the reaper hands back items whose worker died
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # stop() waits this long for in-flight runs before abandoning them
+        self.drain_timeout = drain_timeout
         self.running_tasks: Dict[str, asyncio.Task] = {}
+        self.cancel_tokens: Dict[str, CancellationToken] = {}
         self.shutdown_event = asyncio.Event()
         self.worker_task: Optional[asyncio.Task] = None
-        self._setup_signal_handlers()
+        self.reaper_task: Optional[asyncio.Task] = None
+        self.executor_start_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # On PostgreSQL, enqueues from other processes (API replicas, other
+        # nodes) arrive via LISTEN/NOTIFY instead of the next poll
+        self.listener: Optional[QueueListener] = None
+        # Only a standalone worker process owns the process signals; when
+        # embedded in the API, uvicorn handles them and stops us via lifespan.
+        self.install_signal_handlers = install_signal_handlers
+    
+    @property
+    def concurrency_limit(self) -> int:
+        """Number of runs currently allowed in flight."""
+        return self.limiter.limit if self.limiter else self.max_concurrent
     
     def _setup_signal_handlers(self):
         """Setup signal handlers for graceful shutdown."""
-        def signal_handler(signum, frame):
+        def signal_handler(signum):
             logger.info(f"Received signal {signum}, initiating graceful shutdown...")
             self.shutdown_event.set()
+            self.notify()
         
-        signal.signal(signal.SIGTERM, signal_handler)
-        signal.signal(signal.SIGINT, signal_handler)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._loop.add_signal_handler(signum, signal_handler, signum)
+            except NotImplementedError:
+                # Windows event loops don't support add_signal_handler
+                signal.signal(signum, lambda sig, frame: signal_handler(sig))
     
     async def start(self):
         """Start the queue worker."""
         logger.info("Starting queue worker...")
+        self._loop = asyncio.get_running_loop()
+        if self.install_signal_handlers:
+            self._setup_signal_handlers()
+        # Warm up the executor (its token manager process) while claiming starts
+        self.executor_start_task = asyncio.create_task(self.executor.start())
+        if QueueListener.supported(async_engine):
+            self.listener = QueueListener(async_engine, self.notify)
+            await self.listener.start()
+        self.reaper_task = asyncio.create_task(self._reaper_loop())
         self.worker_task = asyncio.create_task(self._worker_loop())
         await self.worker_task
     
@@ -49,136 +406,299 @@ class QueueWorker:
         """Stop the queue worker gracefully."""
         logger.info("Stopping queue worker...")
         self.shutdown_event.set()
+        self.notify()
         
         if self.worker_task:
             await self.worker_task
         
+        if self.reaper_task:
+            await self.reaper_task
+        
+        if self.listener:
+            await self.listener.stop()
+        
+        if self.executor_start_task:
+            await asyncio.gather(self.executor_start_task, return_exceptions=True)
+        
         # Wait for running tasks to complete (with timeout)
         if self.running_tasks:
             logger.info(f"Waiting for {len(self.running_tasks)} running tasks to complete...")
             try:
                 await asyncio.wait_for(
                     asyncio.gather(*self.running_tasks.values(), return_exceptions=True),
-                    timeout=30.0
+                    timeout=self.drain_timeout
                 )
             except asyncio.TimeoutError:
                 logger.warning("Timeout waiting for running tasks, canceling...")
-                for task in self.running_tasks.values():
+                # Cancel the tasks first so their runs aren't recorded as
+                # failed (their leases expire and they are requeued), then the
+                # tokens, so pipelines give back their threads and LLM slots
+                tasks = list(self.running_tasks.values())
+                for task in tasks:
                     task.cancel()
+                await asyncio.gather(*(token.cancel_async() for token in list(self.cancel_tokens.values())))
+                await asyncio.gather(*tasks, return_exceptions=True)
         
+        # Joins the token manager process in process mode
+        await asyncio.to_thread(self.executor.shutdown, wait=False)
         logger.info("Queue worker stopped")
     
+    def notify(self):
+        """Wake the worker loop immediately. Safe to call from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        
+        if running_loop is loop:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+    
+    async def _wait_for_wakeup(self):
+        """Block until notified, or until the safety-net poll interval elapses."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+    
     async def _worker_loop(self):
         """Main worker loop that processes queued runs."""
         logger.info("Queue worker loop started")
         
         while not self.shutdown_event.is_set():
+            # Clear before checking so a notify() racing with the checks below
+            # is never lost
+            self._wakeup.clear()
+            
             try:
                 # Check if we can process more runs
-                if len(self.running_tasks) >= self.max_concurrent:
-                    await asyncio.sleep(self.poll_interval)
+                capacity = self.concurrency_limit - len(self.running_tasks)
+                if capacity <= 0:
+                    await self._wait_for_wakeup()
                     continue
                 
-                # Get next queued run
-                run_id = await self._get_next_queued_run()
-                if not run_id:
-                    await asyncio.sleep(self.poll_interval)
+                # Claim up to one batch of queued runs and start them together
+                claims = await self._claim_queued_runs(min(capacity, self.claim_batch_size))
+                if not claims:
+                    await self._wait_for_wakeup()
                     continue
                 
-                # Start processing the run
-                task = asyncio.create_task(self._process_run(run_id))
-                self.running_tasks[run_id] = task
+                for claim in await self._start_runs(claims):
+                    task = asyncio.create_task(self._process_run(claim))
+                    self.running_tasks[claim.run_id] = task
                 
                 # Clean up completed tasks
                 await self._cleanup_completed_tasks()
                 
             except Exception as e:
                 logger.error(f"Error in worker loop: {e}", exc_info=True)
-                await asyncio.sleep(self.poll_interval)
+                await asyncio.sleep(min(self.poll_interval, 1.0))
         
         logger.info("Queue worker loop stopped")
     
-    async def _get_next_queued_run(self) -> Optional[str]:
-        """Get the next queued run from the database."""
-        with SessionLocal() as db:
-            # Find oldest queued run that hasn't been picked up
-            queue_item = db.query(QueueItem).filter(
-                and_(
-                    QueueItem.picked_at.is_(None),
-                    QueueItem.done_at.is_(None)
-                )
-            ).order_by(QueueItem.enqueued_at.asc()).first()
-            
-            if not queue_item:
-                return None
-            
-            # Mark as picked up
-            queue_item.picked_at = datetime.utcnow()
-            db.commit()
+    async def _claim_queued_runs(self, limit: int) -> List[QueueClaim]:
+        """Claim up to ``limit`` queued runs from the database in one transaction."""
+        # Database work of the worker goes through the async engine; run_sync
+        # reuses the Session-based queue logic without blocking the event loop
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(
+                claim_queue_items, limit=limit, lease_seconds=self.lease_seconds, policy=self.policy
+            )
+    
+    async def _start_runs(self, claims: List[QueueClaim]) -> List[QueueClaim]:
+        """
+        Move claimed runs to RUNNING in one transaction.
+        
+        Runs that can no longer start (e.g. canceled while queued) have their
+        queue items closed in the same transaction.
+        
+        Returns:
+            Claims of the runs that were started
+        """
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self._start_runs_sync, claims)
+    
+    def _start_runs_sync(self, db: Session, claims: List[QueueClaim]) -> List[QueueClaim]:
+        """Body of _start_runs(), run on the async session's sync facade."""
+        state_manager = create_run_state_manager(db)
+        started = set(state_manager.transition_many(
+            [claim.run_id for claim in claims], RunStatus.RUNNING, commit=False
+        ))
+        
+        skipped = [claim for claim in claims if claim.run_id not in started]
+        if skipped:
+            logger.info(f"Skipping runs that can no longer start: {[claim.run_id for claim in skipped]}")
+            self._mark_queue_done(db, skipped)
+        
+        db.commit()
+        for run_id in started:
+            self._add_log(run_id, LogLevel.INFO, f"Started processing run {run_id}")
+        return [claim for claim in claims if claim.run_id in started]
+    
+    async def _reaper_loop(self):
+        """Periodically requeue or fail items whose lease expired (e.g. after a crash)."""
+        interval = self.lease_seconds / 2
+        
+        while not self.shutdown_event.is_set():
+            try:
+                async with AsyncSessionLocal() as db:
+                    counts = await db.run_sync(reap_expired_leases, max_attempts=self.max_attempts)
+                if counts["requeued"]:
+                    self.notify()
+            except Exception as e:
+                logger.error(f"Error reaping expired leases: {e}", exc_info=True)
             
-            return queue_item.run_id
+            try:
+                await asyncio.wait_for(self.shutdown_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _heartbeat(self, claim: QueueClaim, token: CancellationToken):
+        """
+        Renew the lease on a run's queue item while it is being processed.
+        
+        Also watches the run's canceled flag every second, so cancellations
+        made by other processes (e.g. API replicas) reach the pipeline quickly.
+        If the claim is lost (the lease was reaped), the pipeline is stopped:
+        its result could no longer be recorded.
+        """
+        run_id = claim.run_id
+        renew_interval = self.lease_seconds / 3
+        next_renewal = time.monotonic() + renew_interval
+        
+        while True:
+            await asyncio.sleep(min(CANCEL_CHECK_INTERVAL, renew_interval))
+            try:
+                async with AsyncSessionLocal() as db:
+                    if not await token.is_canceled_async():
+                        canceled = await db.scalar(select(Run.canceled).where(Run.id == run_id))
+                        if canceled:
+                            logger.info(f"Run {run_id} was canceled, stopping its pipeline")
+                            await token.cancel_async()
+                    
+                    if time.monotonic() >= next_renewal:
+                        next_renewal = time.monotonic() + renew_interval
+                        if not await db.run_sync(renew_lease, claim, lease_seconds=self.lease_seconds):
+                            logger.warning(f"Lost queue lease for run {run_id}, stopping its pipeline")
+                            await token.cancel_async()
+                            return
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for run {run_id}: {e}")
+    
+    async def cancel_run(self, run_id: str) -> bool:
+        """Signal an in-flight run's pipeline to stop. Returns False if not running here."""
+        token = self.cancel_tokens.get(run_id)
+        if token is None:
+            return False
+        await token.cancel_async()
+        return True
     
-    async def _process_run(self, run_id: str):
-        """Process a single run asynchronously."""
+    async def _process_run(self, claim: QueueClaim):
+        """Process a single started run asynchronously."""
+        run_id = claim.run_id
         logger.info(f"Processing run {run_id}")
+        heartbeat = None
         
         try:
-            with SessionLocal() as db:
-                state_manager = create_run_state_manager(db)
-                
-                # Transition to running
-                if not state_manager.transition_status(run_id, RunStatus.RUNNING):
-                    logger.warning(f"Could not transition run {run_id} to running")
-                    return
-                
-                # Add log entry
-                self._add_log(db, run_id, LogLevel.INFO, f"Started processing run {run_id}")
+            token = await self.executor.new_token_async()
+            self.cancel_tokens[run_id] = token
+            heartbeat = asyncio.create_task(self._heartbeat(claim, token))
             
             # Execute the build (this is the main work)
-            result = await self._execute_build_async(run_id)
+            result = await self._execute_build_async(run_id, token)
+            self._observe_llm_calls(result)
+            metrics.observe_pipeline(result)
             
-            # Update final status
-            with SessionLocal() as db:
-                state_manager = create_run_state_manager(db)
-                
-                if result.get("status") == "ok":
-                    state_manager.transition_status(run_id, RunStatus.COMPLETED)
-                    self._add_log(db, run_id, LogLevel.INFO, "Build completed successfully")
-                else:
-                    state_manager.transition_status(run_id, RunStatus.FAILED)
-                    self._add_log(db, run_id, LogLevel.ERROR, f"Build failed: {result.get('error', 'Unknown error')}")
-                
-                # Store diffs if any
-                if result.get("diffs"):
-                    self._store_diffs(db, run_id, result["diffs"])
-                
-                # Mark queue item as done
-                self._mark_queue_done(db, run_id)
+            if result.get("status") == "ok":
+                await self._finish_run(claim, RunStatus.COMPLETED, LogLevel.INFO,
+                                 "Build completed successfully", result.get("diffs"))
+            else:
+                await self._finish_run(claim, RunStatus.FAILED, LogLevel.ERROR,
+                                 f"Build failed: {result.get('error', 'Unknown error')}", result.get("diffs"))
         
         except Exception as e:
             logger.error(f"Error processing run {run_id}: {e}", exc_info=True)
             
             # Mark as failed
-            with SessionLocal() as db:
-                state_manager = create_run_state_manager(db)
-                state_manager.transition_status(run_id, RunStatus.FAILED)
-                self._add_log(db, run_id, LogLevel.ERROR, f"Build failed with exception: {str(e)}")
-                self._mark_queue_done(db, run_id)
+            await self._finish_run(claim, RunStatus.FAILED, LogLevel.ERROR,
+                             f"Build failed with exception: {str(e)}")
         
         finally:
-            # Remove from running tasks
+            if heartbeat:
+                heartbeat.cancel()
+            self.cancel_tokens.pop(run_id, None)
+            # Remove from running tasks and let the loop pick up the next run
             self.running_tasks.pop(run_id, None)
+            self.notify()
     
-    async def _execute_build_async(self, run_id: str) -> Dict[str, Any]:
-        """Execute the build in an async context."""
-        # For now, run the synchronous execute_build in a thread pool
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._execute_build_sync, run_id)
+    def _observe_llm_calls(self, result: Dict[str, Any]):
+        """Feed the run's LLM call latencies and errors into the adaptive limit."""
+        if not self.limiter:
+            return
+        
+        for call in result.get("llm_calls") or []:
+            self.limiter.record(call.get("latency_ms"), call.get("ok", True))
+        # A pipeline timeout usually means the model host stopped answering
+        if result.get("timed_out"):
+            self.limiter.record(None, ok=False)
+    
+    async def _finish_run(self, claim: QueueClaim, status: str, level: str, message: str,
+                          diffs: Optional[list] = None):
+        """
+        Record final status, final log line, diffs and queue completion in one transaction.
+        
+        Nothing is recorded if the claim was lost: the run was handed back by
+        the reaper and belongs to whichever worker claims it next.
+        """
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(self._finish_run_sync, claim, status, level, message, diffs)
+    
+    def _finish_run_sync(self, db: Session, claim: QueueClaim, status: str, level: str, message: str,
+                         diffs: Optional[list]):
+        """Body of _finish_run(), run on the async session's sync facade."""
+        run_id = claim.run_id
+        
+        # Close the queue item first; its row (SQLite: the write lock) stays
+        # locked until commit, so the reaper can't take the run back meanwhile
+        done = self._mark_queue_done(db, [claim])
+        if not done:
+            db.rollback()
+            logger.warning(f"Lost queue lease for run {run_id}; discarding its result")
+            return
+        
+        state_manager = create_run_state_manager(db)
+        
+        # A run canceled while running keeps its terminal status
+        current_status = state_manager.get_run_status(run_id)
+        transitioned = not StatusTransitionValidator.is_terminal_status(current_status)
+        if transitioned:
+            state_manager.transition_status(run_id, status, commit=False)
+            # The final line commits with the status rather than through the
+            # sink, so it can't be lost once the run is terminal
+            self._add_final_log(db, run_id, level, message)
+        
+        # Store diffs if any
+        if diffs:
+            self._store_diffs(db, run_id, diffs)
+        
+        db.commit()
+        
+        for item in done:
+            metrics.observe_run(
+                status if transitioned else current_status,
+                _seconds_between(item.enqueued_at, item.picked_at),
+                _seconds_between(item.picked_at, item.done_at)
+            )
     
-    def _execute_build_sync(self, run_id: str) -> Dict[str, Any]:
-        """Execute the build synchronously (to be run in thread pool)."""
-        with SessionLocal() as db:
-            run = db.query(Run).filter(Run.id == run_id).first()
+    async def _execute_build_async(self, run_id: str, token: CancellationToken) -> Dict[str, Any]:
+        """Execute the build on the pipeline executor."""
+        async with AsyncSessionLocal() as db:
+            run = await db.scalar(select(Run).where(Run.id == run_id))
             if not run:
                 return {"status": "error", "error": "Run not found"}
             
@@ -186,40 +706,47 @@ class QueueWorker:
             if run.canceled:
                 return {"status": "canceled", "error": "Run was canceled"}
             
-            try:
-                # Execute the build pipeline
-                result = execute_build(run.prompt)
-                return result
-            except Exception as e:
-                return {"status": "error", "error": str(e)}
-    
-    def _add_log(self, db: Session, run_id: str, level: str, message: str):
-        """Add a log entry to the database."""
-        log_entry = RunLog(
-            run_id=run_id,
-            level=level,
-            message=message
-        )
-        db.add(log_entry)
-        db.commit()
+            prompt = run.prompt
+        
+        try:
+            # Execute the build pipeline
+            return await self.executor.run(execute_build, prompt, token)
+        except PipelineTimeout as e:
+            logger.warning(f"Run {run_id} timed out: {e}")
+            # The pipeline still holds its pool slot; tell it to stop
+            await token.cancel_async()
+            return {"status": "error", "error": str(e), "timed_out": True}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+    
+    def _add_log(self, run_id: str, level: str, message: str):
+        """Queue a log entry on the buffered run log sink."""
+        run_log_sink.add(run_id, level, message)
+    
+    def _add_final_log(self, db: Session, run_id: str, level: str, message: str):
+        """Add a run's last log line to the session; committed (and published) by the caller."""
+        line = RunLog(run_id=run_id, level=level, message=message, ts=datetime.utcnow())
+        db.add(line)
+        db.flush()
+        run_events.record(db, run_id, LOG, {
+            "id": line.id, "ts": line.ts.isoformat(), "level": level, "message": message
+        })
     
     def _store_diffs(self, db: Session, run_id: str, diffs: list):
-        """Store diffs in the database."""
-        for idx, diff in enumerate(diffs):
-            diff_entry = RunDiff(
-                run_id=run_id,
-                idx=idx,
-                content_json=diff
-            )
-            db.add(diff_entry)
-        db.commit()
+        """Add diffs (file contents as shared blobs) to the session; committed by the caller."""
+        store_diffs(db, run_id, diffs)
     
-    def _mark_queue_done(self, db: Session, run_id: str):
-        """Mark a queue item as done."""
-        queue_item = db.query(QueueItem).filter(QueueItem.run_id == run_id).first()
-        if queue_item:
-            queue_item.done_at = datetime.utcnow()
-            db.commit()
+    def _mark_queue_done(self, db: Session, claims: List[QueueClaim]) -> list:
+        """Mark claimed queue items still held as done; committed by the caller. Returns their timestamps."""
+        rows = db.execute(
+            update(QueueItem).where(_claimed_by(claims)).values(
+                done_at=datetime.utcnow(),
+                lease_expires_at=None
+            ).returning(QueueItem.run_id, QueueItem.enqueued_at, QueueItem.picked_at, QueueItem.done_at),
+            execution_options={"synchronize_session": False}
+        ).all()
+        run_counters.record(db, queue={"processing": -len(rows), "done": len(rows)})
+        return rows
     
     async def _cleanup_completed_tasks(self):
         """Clean up completed tasks from running_tasks."""
@@ -238,12 +765,20 @@ class QueueManager:
     def __init__(self):
         self.worker: Optional[QueueWorker] = None
     
-    async def start_worker(self, max_concurrent: int = 2):
+    async def start_worker(self, max_concurrent: int = 2, poll_interval: float = 30.0,
+                           lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = 3,
+                           limiter: Optional[AIMDLimiter] = None):
         """Start the queue worker."""
         if self.worker:
             return
         
-        self.worker = QueueWorker(max_concurrent=max_concurrent)
+        self.worker = QueueWorker(
+            max_concurrent=max_concurrent,
+            poll_interval=poll_interval,
+            lease_seconds=lease_seconds,
+            max_attempts=max_attempts,
+            limiter=limiter
+        )
         asyncio.create_task(self.worker.start())
     
     async def stop_worker(self):
@@ -252,49 +787,71 @@ class QueueManager:
             await self.worker.stop()
             self.worker = None
     
-    def enqueue_run(self, run_id: str) -> bool:
-        """Enqueue a run for processing."""
-        with SessionLocal() as db:
-            # Check if already queued
-            existing = db.query(QueueItem).filter(QueueItem.run_id == run_id).first()
-            if existing:
-                return False
-            
-            # Create queue item
-            queue_item = QueueItem(run_id=run_id)
-            db.add(queue_item)
-            db.commit()
-            
-            logger.info(f"Enqueued run {run_id}")
-            return True
+    async def cancel_run(self, run_id: str) -> bool:
+        """Stop an in-flight run processed by this process's worker, if any."""
+        if self.worker:
+            return await self.worker.cancel_run(run_id)
+        return False
+    
+    async def enqueue_run_async(self, run_id: str, priority: Optional[str] = DEFAULT_PRIORITY,
+                                tenant: Optional[str] = DEFAULT_TENANT) -> bool:
+        """Enqueue a run for processing from the event loop."""
+        async with AsyncSessionLocal() as db:
+            added = await db.run_sync(self._add_queue_item, run_id, priority, tenant)
+        
+        if added and self.worker:
+            self.worker.notify()
+        return added
+    
+    def add_queue_items(self, db: Session, items: List[Tuple[str, Optional[str], Optional[str]]]):
+        """
+        Add queue items for new runs to the session; committed by the caller.
+        
+        ``items`` are (run_id, priority, tenant) in enqueue order. Call
+        wake_worker() after the commit.
+        """
+        if not items:
+            return
+        db.add_all([
+            QueueItem(run_id=run_id, priority=normalize_priority(priority), tenant=normalize_tenant(tenant))
+            for run_id, priority, tenant in items
+        ])
+        run_counters.record(db, queue={"queued": len(items)})
+        publish_queue_change(db)
+    
+    def wake_worker(self):
+        """Wake the in-process worker, e.g. after committing add_queue_items()."""
+        if self.worker:
+            self.worker.notify()
+    
+    def _add_queue_item(self, db: Session, run_id: str, priority: Optional[str],
+                        tenant: Optional[str]) -> bool:
+        """Insert and commit the queue item; False if the run was already queued."""
+        # Check if already queued
+        existing = db.query(QueueItem).filter(QueueItem.run_id == run_id).first()
+        if existing:
+            return False
+        
+        # Create queue item
+        priority = normalize_priority(priority)
+        tenant = normalize_tenant(tenant)
+        queue_item = QueueItem(run_id=run_id, priority=priority, tenant=tenant)
+        db.add(queue_item)
+        run_counters.record(db, queue={"queued": 1})
+        publish_queue_change(db)
+        db.commit()
+        
+        logger.info(f"Enqueued run {run_id} (priority={priority}, tenant={tenant})")
+        return True
     
     def get_queue_status(self) -> Dict[str, Any]:
-        """Get current queue status."""
-        with SessionLocal() as db:
-            total_queued = db.query(QueueItem).filter(
-                and_(
-                    QueueItem.picked_at.is_(None),
-                    QueueItem.done_at.is_(None)
-                )
-            ).count()
-            
-            total_processing = db.query(QueueItem).filter(
-                and_(
-                    QueueItem.picked_at.isnot(None),
-                    QueueItem.done_at.is_(None)
-                )
-            ).count()
-            
-            total_done = db.query(QueueItem).filter(
-                QueueItem.done_at.isnot(None)
-            ).count()
-            
-            return {
-                "queued": total_queued,
-                "processing": total_processing,
-                "done": total_done,
-                "worker_running": self.worker is not None
-            }
+        """Get current queue status from the in-memory counters."""
+        return {
+            **run_counters.queue_status(),
+            "worker_running": self.worker is not None,
+            "concurrency_limit": self.worker.concurrency_limit if self.worker else None,
+            "adaptive_concurrency": bool(self.worker and self.worker.limiter)
+        }
 
 
 # Global queue manager instance
@@ -0,0 +1,113 @@
+"""Cross-process queue wakeups over PostgreSQL LISTEN/NOTIFY."""
+
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Channel notified whenever a queue item becomes claimable
+QUEUE_CHANNEL = "builder_queue"
+
+
+def publish_queue_change(db: Session, channel: str = QUEUE_CHANNEL) -> None:
+    """
+    Notify listening workers that queue items became claimable.
+
+    NOTIFY is transactional: it is delivered when ``db`` commits and dropped
+    on rollback, so workers never wake for a row they can't see yet. No-op on
+    databases without LISTEN/NOTIFY, where each process wakes its own worker.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": channel})
+
+
+class QueueListener:
+    """
+    Calls ``callback`` whenever another process publishes a queue change.
+
+    Holds one dedicated asyncpg connection with ``LISTEN`` on the channel.
+    If the connection drops, it reconnects with backoff and calls
+    ``callback`` once more, since notifications sent in the meantime are lost.
+    ``callback`` runs on the event loop.
+    """
+
+    def __init__(self, engine: AsyncEngine, callback: Callable[[], None],
+                 channel: str = QUEUE_CHANNEL, max_backoff: float = 30.0):
+        self.engine = engine
+        self.callback = callback
+        self.channel = channel
+        self.max_backoff = max_backoff
+        self.listening = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def supported(engine: AsyncEngine) -> bool:
+        """Whether ``engine`` can LISTEN (PostgreSQL through asyncpg)."""
+        return engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg"
+
+    async def start(self) -> None:
+        """Start listening in the background."""
+        if self._task:
+            return
+        self._stop.clear()
+        self._task = asyncio.create_task(self._listen_loop())
+
+    async def stop(self) -> None:
+        """Stop listening and release the connection."""
+        if not self._task:
+            return
+        self._stop.set()
+        await self._task
+        self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        self.callback()
+
+    async def _listen_loop(self) -> None:
+        backoff = 1.0
+        first = True
+        while not self._stop.is_set():
+            lost = asyncio.Event()
+            try:
+                async with self.engine.connect() as conn:
+                    pg = (await conn.get_raw_connection()).driver_connection
+                    on_lost = lambda _: lost.set()  # noqa: E731
+                    pg.add_termination_listener(on_lost)
+                    await pg.add_listener(self.channel, self._on_notification)
+                    self.listening.set()
+                    logger.info(f"Listening for queue notifications on '{self.channel}'")
+                    if not first:
+                        # Catch up on anything published while disconnected
+                        self.callback()
+                    first = False
+                    backoff = 1.0
+
+                    stop_wait = asyncio.create_task(self._stop.wait())
+                    lost_wait = asyncio.create_task(lost.wait())
+                    await asyncio.wait({stop_wait, lost_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    stop_wait.cancel()
+                    lost_wait.cancel()
+
+                    if not lost.is_set():
+                        await pg.remove_listener(self.channel, self._on_notification)
+                        pg.remove_termination_listener(on_lost)
+                    else:
+                        # Don't hand a dead connection back to the pool
+                        await conn.invalidate()
+            except Exception as e:
+                logger.warning(f"Queue listener connection failed: {e}")
+
+            self.listening.clear()
+            if self._stop.is_set():
+                return
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,90 @@
+"""Byte-bounded LRU of serialized API responses for runs that can no longer change."""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+
+# Rough per-entry bookkeeping cost on top of the body
+_ENTRY_OVERHEAD = 200
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """
+    Least-recently-used cache of response bodies, bounded by their total size.
+
+    Only for responses that never change once cached (terminal runs), so
+    entries are never invalidated, only evicted. Bodies larger than
+    ``max_entry_bytes`` are not cached so one huge diff can't flush the rest.
+    Safe to use from any thread.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache from RESPONSE_CACHE_* environment variables (0 bytes disables it)."""
+        return cls(
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_entry_bytes=int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024))),
+        )
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, etag: str) -> bool:
+        """Cache ``body``; returns False if it is too large to keep."""
+        cost = len(body) + _ENTRY_OVERHEAD
+        if cost > self.max_entry_bytes or cost > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous.body) + _ENTRY_OVERHEAD
+            self._entries[key] = CachedResponse(body=body, etag=etag)
+            self.size_bytes += cost
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted.body) + _ENTRY_OVERHEAD
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Responses of terminal runs served by GET /runs/{id} and /runs/{id}/diffs
+terminal_responses = ResponseCache.from_env()
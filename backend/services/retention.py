@@ -0,0 +1,208 @@
+"""Retention of run logs and diffs: archive terminal runs to compressed files."""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from ..models import Run, RunLog, RunDiff, RunStatus
+from .db import DATABASE_URL, engine
+from .blobs import assemble_diffs, collect_garbage, diffs_query
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = [RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELED]
+
+
+def _default_archive_dir() -> str:
+    if DATABASE_URL.startswith("sqlite:///"):
+        return os.path.join(os.path.dirname(DATABASE_URL.replace("sqlite:///", "")) or ".", "archive")
+    return "./data/archive"
+
+
+ARCHIVE_DIR = Path(os.getenv("RUN_ARCHIVE_DIR", _default_archive_dir()))
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Which terminal runs keep their logs and diffs in the database.
+
+    A terminal run is archived once it is older than ``max_age_days`` (by
+    last update) or falls outside the ``keep_last`` most recently updated
+    terminal runs. Either limit can be None to disable it.
+    """
+    max_age_days: Optional[float] = 14.0
+    keep_last: Optional[int] = None
+    batch_size: int = 100
+    # VACUUM SQLite once this share of its pages is free after a pass
+    vacuum_free_ratio: float = 0.25
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Build a policy from RUN_RETENTION_* environment variables (0 disables a limit)."""
+        days = float(os.getenv("RUN_RETENTION_DAYS", "14"))
+        keep = int(os.getenv("RUN_RETENTION_KEEP", "0"))
+        return cls(
+            max_age_days=days if days > 0 else None,
+            keep_last=keep if keep > 0 else None,
+            batch_size=int(os.getenv("RUN_RETENTION_BATCH_SIZE", "100")),
+            vacuum_free_ratio=float(os.getenv("RUN_RETENTION_VACUUM_RATIO", "0.25")),
+        )
+
+
+def archive_path(run_id: str) -> Path:
+    """Location of a run's archive segment (sharded by id prefix)."""
+    return ARCHIVE_DIR / run_id[:2] / f"{run_id}.json.gz"
+
+
+def select_runs_to_archive(db: Session, policy: RetentionPolicy) -> List[str]:
+    """Return up to ``policy.batch_size`` terminal, unarchived runs past the policy limits."""
+    conditions = []
+    if policy.max_age_days is not None:
+        cutoff = datetime.utcnow() - timedelta(days=policy.max_age_days)
+        conditions.append(Run.updated_at < cutoff)
+    if policy.keep_last is not None:
+        newest = select(Run.id).where(Run.status.in_(TERMINAL_STATUSES)).order_by(
+            Run.updated_at.desc(), Run.id.desc()
+        ).limit(policy.keep_last)
+        conditions.append(Run.id.not_in(newest))
+    if not conditions:
+        return []
+
+    stmt = select(Run.id).where(
+        and_(
+            Run.status.in_(TERMINAL_STATUSES),
+            Run.archived_at.is_(None),
+            or_(*conditions),
+        )
+    )
+
+    return list(db.scalars(stmt.order_by(Run.updated_at.asc()).limit(policy.batch_size)))
+
+
+def archive_run(db: Session, run_id: str) -> bool:
+    """
+    Write a run's logs and diffs to its archive segment and delete the rows.
+
+    The segment is written (atomically, via rename) before the rows are
+    deleted, and the delete is conditional on the run not being archived yet,
+    so an interrupted pass is simply repeated.
+
+    Returns:
+        True if the run was archived by this call
+    """
+    logs = db.scalars(select(RunLog).where(RunLog.run_id == run_id).order_by(RunLog.id)).all()
+    diffs = assemble_diffs(db.execute(diffs_query(run_id)).all())
+
+    segment = {
+        "run_id": run_id,
+        "logs": [
+            {"id": log.id, "ts": log.ts.isoformat() if log.ts else None, "level": log.level, "message": log.message}
+            for log in logs
+        ],
+        "diffs": [{"idx": idx, "content": diff} for idx, diff in enumerate(diffs)],
+    }
+
+    path = archive_path(run_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(segment, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    # Keep updated_at as is: archiving doesn't change the run, and the
+    # keep_last policy orders by it
+    result = db.execute(
+        update(Run).where(and_(Run.id == run_id, Run.archived_at.is_(None))).values(
+            archived_at=datetime.utcnow(), updated_at=Run.updated_at
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        return False
+
+    # Only delete what went into the segment; lines logged later stay in the table
+    if logs:
+        db.execute(delete(RunLog).where(and_(RunLog.run_id == run_id, RunLog.id <= logs[-1].id)))
+    db.execute(delete(RunDiff).where(RunDiff.run_id == run_id))
+    db.commit()
+    return True
+
+
+def load_archive(run_id: str) -> Optional[Dict[str, Any]]:
+    """Read a run's archive segment, or None if it has none."""
+    path = archive_path(run_id)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def run_retention_pass(session_factory, policy: RetentionPolicy) -> int:
+    """Archive eligible runs in batches; returns the number archived."""
+    archived = 0
+    while True:
+        with session_factory() as db:
+            run_ids = select_runs_to_archive(db, policy)
+            batch = 0
+            for run_id in run_ids:
+                try:
+                    if archive_run(db, run_id):
+                        batch += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Failed to archive run {run_id}: {e}", exc_info=True)
+        archived += batch
+        if batch == 0 or len(run_ids) < policy.batch_size:
+            break
+
+    if archived:
+        logger.info(f"Archived logs and diffs of {archived} runs to {ARCHIVE_DIR}")
+        with session_factory() as db:
+            removed = collect_garbage(db)
+        if removed:
+            logger.info(f"Removed {removed} unreferenced diff blobs")
+        _compact(policy)
+    return archived
+
+
+def _compact(policy: RetentionPolicy) -> None:
+    """Return space freed by deleted rows to the filesystem (SQLite only)."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        page_count = conn.execute(text("PRAGMA page_count")).scalar() or 0
+        free_count = conn.execute(text("PRAGMA freelist_count")).scalar() or 0
+        if page_count and free_count / page_count >= policy.vacuum_free_ratio:
+            logger.info(f"Vacuuming database ({free_count} of {page_count} pages free)")
+            conn.execute(text("VACUUM"))
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+
+async def retain_periodically(session_factory, policy: RetentionPolicy, interval: float,
+                              stop_event: asyncio.Event) -> None:
+    """Run retention passes every ``interval`` seconds until stopped."""
+    while not stop_event.is_set():
+        try:
+            # File and database work happens on a thread, off the event loop
+            await asyncio.to_thread(run_retention_pass, session_factory, policy)
+        except Exception as e:
+            logger.warning(f"Run retention pass failed: {e}")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,137 @@
+"""Priority classes and weighted fair dequeue policy for the run queue."""
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Relative share of dequeues each priority class gets while all are backlogged
+PRIORITY_WEIGHTS: Dict[str, int] = {"high": 4, "normal": 2, "low": 1}
+DEFAULT_PRIORITY = "normal"
+DEFAULT_TENANT = "default"
+
+
+def normalize_priority(value: Any) -> str:
+    """Map a requested priority to a known class, falling back to the default."""
+    if isinstance(value, str) and value.lower() in PRIORITY_WEIGHTS:
+        return value.lower()
+    return DEFAULT_PRIORITY
+
+
+def normalize_tenant(value: Any) -> str:
+    """Map a requested tenant/owner to a queue key, falling back to the default."""
+    if value is None or str(value).strip() == "":
+        return DEFAULT_TENANT
+    return str(value).strip()[:64]
+
+
+@dataclass
+class QueueCandidate:
+    """A queued item considered for dequeue."""
+    item_id: int
+    run_id: str
+    priority: str
+    tenant: str
+    enqueued_at: datetime
+
+
+class WeightedFairPolicy:
+    """
+    Weighted fair dequeue across priority classes with per-tenant caps.
+
+    Classes are served by stride scheduling: each dequeue advances the chosen
+    class's virtual pass by 1/weight and the class with the lowest pass goes
+    next, so backlogged classes get dequeues in proportion to their weights
+    and low priority work is never starved. A class that was idle rejoins at
+    the current virtual time instead of cashing in credit for the idle period.
+
+    Within a class the tenant with the fewest in-flight runs goes first (ties
+    broken by queue age), and tenants at ``tenant_max_concurrent`` are skipped
+    entirely, so one client submitting hundreds of builds cannot monopolize
+    the workers.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None,
+                 tenant_max_concurrent: Optional[int] = None):
+        self.weights = dict(weights or PRIORITY_WEIGHTS)
+        self.tenant_max_concurrent = tenant_max_concurrent
+        self._pass: Dict[str, float] = {name: 0.0 for name in self.weights}
+        self._vtime = 0.0
+
+    @classmethod
+    def from_env(cls) -> "WeightedFairPolicy":
+        """Build a policy from QUEUE_TENANT_MAX_CONCURRENT (0 = unlimited)."""
+        cap = int(os.getenv("QUEUE_TENANT_MAX_CONCURRENT", "0"))
+        return cls(tenant_max_concurrent=cap if cap > 0 else None)
+
+    def select(self, candidates: List[QueueCandidate],
+               running_by_tenant: Dict[str, int]) -> Optional[QueueCandidate]:
+        """
+        Choose the next item to dequeue.
+
+        Args:
+            candidates: Head-of-line item for each (priority, tenant) group
+            running_by_tenant: In-flight run count per tenant
+
+        Returns:
+            The chosen candidate, or None if every tenant is at its cap
+        """
+        if self.tenant_max_concurrent is not None:
+            candidates = [
+                c for c in candidates
+                if running_by_tenant.get(c.tenant, 0) < self.tenant_max_concurrent
+            ]
+        if not candidates:
+            return None
+
+        by_class: Dict[str, List[QueueCandidate]] = {}
+        for candidate in candidates:
+            by_class.setdefault(self._class_of(candidate), []).append(candidate)
+
+        for name in by_class:
+            self._pass[name] = max(self._pass[name], self._vtime)
+
+        # Lowest pass first; on ties prefer the heavier class
+        chosen_class = min(by_class, key=lambda name: (self._pass[name], -self.weights[name]))
+        self._vtime = self._pass[chosen_class]
+        self._pass[chosen_class] += 1.0 / self.weights[chosen_class]
+
+        return min(
+            by_class[chosen_class],
+            key=lambda c: (running_by_tenant.get(c.tenant, 0), c.enqueued_at, c.item_id)
+        )
+
+    def select_many(self, queues: Dict[Tuple[str, str], List[QueueCandidate]],
+                    running_by_tenant: Dict[str, int], limit: int) -> List[QueueCandidate]:
+        """
+        Choose up to ``limit`` items in dequeue order.
+
+        Args:
+            queues: Queued items per (priority, tenant) group, oldest first
+            running_by_tenant: In-flight run count per tenant
+            limit: Maximum number of items to choose
+
+        Returns:
+            The chosen candidates; each counts as in flight for later picks
+        """
+        remaining = {key: list(items) for key, items in queues.items() if items}
+        running = dict(running_by_tenant)
+        chosen: List[QueueCandidate] = []
+
+        while len(chosen) < limit and remaining:
+            pick = self.select([items[0] for items in remaining.values()], running)
+            if pick is None:
+                break
+
+            chosen.append(pick)
+            running[pick.tenant] = running.get(pick.tenant, 0) + 1
+            key = (pick.priority, pick.tenant)
+            remaining[key].pop(0)
+            if not remaining[key]:
+                del remaining[key]
+
+        return chosen
+
+    def _class_of(self, candidate: QueueCandidate) -> str:
+        """Unknown classes (e.g. from removed weights) are scheduled as default."""
+        return candidate.priority if candidate.priority in self.weights else DEFAULT_PRIORITY
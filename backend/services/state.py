@@ -1,9 +1,13 @@
 """Status transition utilities and validation for run state management."""
 
-from typing import Set, Optional, Dict, Any
+from typing import Set, Optional, Dict, Any, List
 from datetime import datetime
 
+from sqlalchemy import update
+
 from ..models import RunStatus, Run
+from .counters import run_counters
+from .events import run_events, STATUS
 
 
 class InvalidStatusTransition(Exception):
@@ -17,7 +21,8 @@ class StatusTransitionValidator:
     # Valid transitions: from_status -> {to_status1, to_status2, ...}
     VALID_TRANSITIONS: Dict[str, Set[str]] = {
         RunStatus.QUEUED: {RunStatus.RUNNING, RunStatus.CANCELED, RunStatus.FAILED},
-        RunStatus.RUNNING: {RunStatus.NEEDS_APPROVAL, RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELED},
+        # RUNNING -> QUEUED happens when an expired queue lease is requeued
+        RunStatus.RUNNING: {RunStatus.QUEUED, RunStatus.NEEDS_APPROVAL, RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELED},
         RunStatus.NEEDS_APPROVAL: {RunStatus.APPROVED, RunStatus.CANCELED, RunStatus.FAILED},
         RunStatus.APPROVED: {RunStatus.RUNNING, RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELED},
         RunStatus.COMPLETED: set(),  # Terminal state
@@ -46,6 +51,14 @@ class StatusTransitionValidator:
         """Get all valid transitions from a given status."""
         return cls.VALID_TRANSITIONS.get(from_status, set())
     
+    @classmethod
+    def get_source_statuses(cls, to_status: str) -> Set[str]:
+        """Get all statuses that may transition to a given status."""
+        return {
+            from_status for from_status, targets in cls.VALID_TRANSITIONS.items()
+            if to_status in targets
+        }
+    
     @classmethod
     def is_terminal_status(cls, status: str) -> bool:
         """Check if a status is terminal (no further transitions allowed)."""
@@ -65,7 +78,8 @@ class RunStateManager:
     
     def transition_status(self, run_id: str, new_status: str, 
                          current_node: Optional[str] = None,
-                         canceled: Optional[bool] = None) -> bool:
+                         canceled: Optional[bool] = None,
+                         commit: bool = True) -> bool:
         """
         Transition a run to a new status with validation.
         
@@ -74,6 +88,8 @@ class RunStateManager:
             new_status: Target status
             current_node: Optional new current node
             canceled: Optional canceled flag
+            commit: Commit immediately; pass False to fold the change into a
+                larger transaction committed by the caller
             
         Returns:
             True if transition was successful, False if run not found
@@ -87,6 +103,7 @@ class RunStateManager:
         
         # Validate transition
         self.validate_transition(run.status, new_status)
+        run_counters.record_transition(self.db, run.status, new_status)
         
         # Update run
         run.status = new_status
@@ -98,9 +115,64 @@ class RunStateManager:
         if canceled is not None:
             run.canceled = canceled
         
-        self.db.commit()
+        run_events.record(self.db, run_id, STATUS, {
+            "status": new_status,
+            "current_node": run.current_node,
+            "canceled": bool(run.canceled),
+            "updated_at": run.updated_at.isoformat(),
+        })
+        
+        if commit:
+            self.db.commit()
         return True
     
+    def transition_many(self, run_ids: List[str], new_status: str,
+                        commit: bool = True) -> List[str]:
+        """
+        Transition several runs to a new status in a single UPDATE.
+        
+        Runs whose current status cannot transition to ``new_status`` (for
+        example runs canceled in the meantime) are left untouched rather than
+        raising.
+        
+        Args:
+            run_ids: The run IDs
+            new_status: Target status
+            commit: Commit immediately; pass False to fold the change into a
+                larger transaction committed by the caller
+            
+        Returns:
+            IDs of the runs that were transitioned
+        """
+        if not run_ids:
+            return []
+        
+        # Previous statuses feed the in-memory counters
+        previous = dict(self.db.query(Run.id, Run.status).filter(Run.id.in_(run_ids)).all())
+        
+        now = datetime.utcnow()
+        result = self.db.execute(
+            update(Run).where(
+                Run.id.in_(run_ids),
+                Run.status.in_(StatusTransitionValidator.get_source_statuses(new_status))
+            ).values(status=new_status, updated_at=now).returning(Run.id, Run.current_node, Run.canceled),
+            execution_options={"synchronize_session": False}
+        )
+        transitioned = set()
+        for run_id, current_node, canceled in result.all():
+            transitioned.add(run_id)
+            run_counters.record_transition(self.db, previous.get(run_id, new_status), new_status)
+            run_events.record(self.db, run_id, STATUS, {
+                "status": new_status,
+                "current_node": current_node,
+                "canceled": bool(canceled),
+                "updated_at": now.isoformat(),
+            })
+        
+        if commit:
+            self.db.commit()
+        return [run_id for run_id in run_ids if run_id in transitioned]
+    
     def validate_transition(self, from_status: str, to_status: str) -> None:
         """Validate a status transition."""
         StatusTransitionValidator.validate_transition(from_status, to_status)
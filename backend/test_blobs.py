@@ -0,0 +1,42 @@
+"""Content-addressed diff blobs: storing diffs while garbage collection runs."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from backend.models import DiffBlob
+from backend.services.blobs import assemble_diffs, collect_garbage, diffs_query, store_diffs
+
+DIFF = {"path": "src/app.py", "content": "print('hello')\n" * 40}
+
+
+def test_blob_reused_while_collecting_is_kept(db_engine, session_factory):
+    # A blob whose last run was deleted long ago: garbage unless reused
+    with session_factory() as db:
+        store_diffs(db, "old-run", [DIFF])
+        db.commit()
+        db.execute(update(DiffBlob).values(created_at=datetime.utcnow() - timedelta(days=1)))
+        db.commit()
+    with db_engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM run_diffs")
+
+    removed = []
+
+    def collect():
+        with session_factory() as db:
+            removed.append(collect_garbage(db))
+
+    with session_factory() as db:
+        store_diffs(db, "new-run", [DIFF])
+        # Collect garbage before the new diffs are committed
+        collector = threading.Thread(target=collect)
+        collector.start()
+        time.sleep(0.3)
+        db.commit()
+    collector.join()
+
+    with session_factory() as db:
+        assert assemble_diffs(db.execute(diffs_query("new-run"))) == [DIFF]
+    assert removed == [0]
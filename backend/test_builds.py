@@ -0,0 +1,76 @@
+"""Build creation: idempotency keys, coalescing of duplicate builds and batches."""
+
+import uuid
+
+from backend.app.main import MAX_BATCH_BUILDS
+from backend.models import QueueItem
+from backend.services.db import SessionLocal
+
+
+def _prompt() -> str:
+    # Unique per test, so coalescing never reaches runs of other tests
+    return f"build {uuid.uuid4()}"
+
+
+def test_coalesced_key_maps_to_one_run(client):
+    prompt, key = _prompt(), str(uuid.uuid4())
+    first = client.post("/build", json={"prompt": prompt}).json()
+    keyed = client.post("/build", json={"prompt": prompt, "request_id": key}).json()
+
+    # A keyed request gets its own run even when an identical one is in flight
+    assert keyed["run_id"] != first["run_id"]
+    assert not keyed.get("coalesced")
+
+    assert client.post(f"/runs/{first['run_id']}/cancel").json() == {"ok": True}
+    retried = client.post("/build", json={"prompt": prompt, "request_id": key}).json()
+    assert retried == {"run_id": keyed["run_id"]}
+
+
+def test_unkeyed_duplicates_coalesce(client):
+    prompt = _prompt()
+    first = client.post("/build", json={"prompt": prompt}).json()
+    second = client.post("/build", json={"prompt": prompt}).json()
+    assert second == {"run_id": first["run_id"], "coalesced": True}
+
+
+def test_batch_resolves_existing_and_repeated_keys(client):
+    existing_key, key, later_key = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+    existing = client.post("/build", json={"prompt": _prompt(), "request_id": existing_key}).json()["run_id"]
+
+    keyed_prompt, unkeyed_prompt = _prompt(), _prompt()
+    batch = client.post("/builds:batch", json=[
+        {"prompt": _prompt(), "request_id": existing_key},
+        {"prompt": keyed_prompt, "request_id": key},
+        {"prompt": _prompt(), "request_id": key},
+        {"prompt": keyed_prompt},
+        {"prompt": unkeyed_prompt},
+        {"prompt": unkeyed_prompt},
+        {"prompt": unkeyed_prompt, "request_id": later_key},
+    ]).json()
+
+    runs = batch["runs"]
+    assert batch["run_ids"] == [run["run_id"] for run in runs]
+    # Known key: the existing run; repeated key: the run created for it earlier in the batch
+    assert runs[0] == {"run_id": existing}
+    assert runs[2] == {"run_id": runs[1]["run_id"]}
+    # Unkeyed repeats coalesce onto the first run of their build, keyed or not
+    assert runs[3] == {"run_id": runs[1]["run_id"], "coalesced": True}
+    assert runs[5] == {"run_id": runs[4]["run_id"], "coalesced": True}
+    # A keyed repeat of an unkeyed build gets its own run
+    assert runs[6]["run_id"] not in (runs[4]["run_id"], existing) and not runs[6].get("coalesced")
+
+    # One queue item per run, nothing for the repeats
+    with SessionLocal() as db:
+        queued = [run_id for run_id, in db.query(QueueItem.run_id).filter(QueueItem.run_id.in_(batch["run_ids"]))]
+    assert sorted(queued) == sorted({existing, runs[1]["run_id"], runs[4]["run_id"], runs[6]["run_id"]})
+
+    # The keys stay bound to their runs
+    for request_key, run in ((key, runs[1]), (later_key, runs[6])):
+        retried = client.post("/build", json={"prompt": _prompt(), "request_id": request_key}).json()
+        assert retried == {"run_id": run["run_id"]}
+
+
+def test_batch_limits(client):
+    assert client.post("/builds:batch", json=[]).json() == {"run_ids": [], "runs": []}
+    too_many = [{"prompt": _prompt()} for _ in range(MAX_BATCH_BUILDS + 1)]
+    assert client.post("/builds:batch", json=too_many).status_code == 413
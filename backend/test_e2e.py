@@ -1,9 +1,10 @@
 """End-to-end smoke tests for the build system."""
 
 import asyncio
+import json
 import time
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 class E2ETestRunner:
@@ -46,6 +47,28 @@ class E2ETestRunner:
             print(f"❌ Health check failed with exception: {e}")
             return False
     
+    def wait_for_run(self, run_id: str, max_wait: float) -> Optional[str]:
+        """Follow GET /runs/{id}/events until the run ends; returns its final status."""
+        event = None
+        deadline = time.time() + max_wait
+        with self.session.get(f"{self.base_url}/runs/{run_id}/events", stream=True, timeout=max_wait) as response:
+            if response.status_code != 200:
+                print(f"❌ Failed to open event stream: {response.status_code}")
+                return None
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if time.time() > deadline:
+                    return None
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "status":
+                        print(f"Run status: {data['status']}")
+                    elif event == "end":
+                        return data["status"]
+        return None
+    
     def test_build_workflow(self) -> bool:
         """Test complete build workflow."""
         print("Testing build workflow...")
@@ -70,26 +93,9 @@ class E2ETestRunner:
             
             print(f"✅ Build created with run_id: {run_id}")
             
-            # Poll for completion (with timeout)
-            max_wait = 60  # 60 seconds timeout
-            start_time = time.time()
-            
-            while time.time() - start_time < max_wait:
-                response = self.session.get(f"{self.base_url}/runs/{run_id}")
-                if response.status_code != 200:
-                    print(f"❌ Failed to get run status: {response.status_code}")
-                    return False
-                
-                run_data = response.json()
-                status = run_data.get("status")
-                
-                print(f"Run status: {status}")
-                
-                if status in ["completed", "failed", "canceled"]:
-                    break
-                
-                time.sleep(2)
-            else:
+            # Follow the run's event stream until it ends (with timeout)
+            status = self.wait_for_run(run_id, max_wait=60)
+            if status is None:
                 print("❌ Build did not complete within timeout")
                 return False
             
@@ -174,6 +180,11 @@ class E2ETestRunner:
                 print(f"❌ Metrics endpoint failed: {response.status_code}")
                 return False
             
+            if "builder_runs" not in response.text:
+                print("❌ Metrics exposition is missing builder_runs")
+                return False
+            
+            response = self.session.get(f"{self.base_url}/metrics/summary")
             metrics_data = response.json()
             print(f"✅ Metrics: {metrics_data}")
             return True
@@ -0,0 +1,42 @@
+"""Run log sink: lines added before start() never block the event loop."""
+
+import asyncio
+import time
+import uuid
+
+from backend.models import RunLog
+from backend.services.db import SessionLocal, engine
+from backend.services.log_sink import RunLogSink
+
+
+def _messages(run_id: str):
+    with SessionLocal() as db:
+        return [line.message for line in db.query(RunLog).filter(RunLog.run_id == run_id).order_by(RunLog.id)]
+
+
+def test_unstarted_sink_writes_off_the_event_loop():
+    sink, run_id = RunLogSink(), str(uuid.uuid4())
+
+    async def scenario():
+        # Another connection holds the write lock, like the loop's own async
+        # session does while it runs worker code through run_sync
+        with engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            started = time.monotonic()
+            for i in range(3):
+                assert sink.add(run_id, "info", f"line {i}")
+            assert time.monotonic() - started < 1
+            conn.rollback()
+
+    asyncio.run(scenario())
+
+    deadline = time.monotonic() + 10
+    while len(_messages(run_id)) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _messages(run_id) == ["line 0", "line 1", "line 2"]
+
+
+def test_unstarted_sink_writes_at_once_off_the_loop():
+    run_id = str(uuid.uuid4())
+    assert RunLogSink().add(run_id, "info", "line")
+    assert _messages(run_id) == ["line"]
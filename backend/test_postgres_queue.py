@@ -0,0 +1,54 @@
+"""LISTEN/NOTIFY queue wakeups against a real PostgreSQL server.
+
+Skipped unless TEST_POSTGRES_URL points at a scratch database (see the
+postgres_url fixture in conftest.py); test_queue_claiming.py runs its claim
+stress test there too.
+"""
+
+import asyncio
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import QueueItem
+from backend.services.db import create_async_db_engine
+from backend.services.queue import QueueManager
+from backend.services.queue_notify import QueueListener, publish_queue_change
+
+
+def test_enqueue_notifies_listeners(postgres_url):
+    engine = create_engine(postgres_url)
+    session_factory = sessionmaker(bind=engine)
+
+    async def scenario():
+        async_engine = create_async_db_engine(postgres_url)
+        woken = asyncio.Event()
+        listener = QueueListener(async_engine, woken.set)
+        await listener.start()
+        await asyncio.wait_for(listener.listening.wait(), timeout=10)
+
+        # A rolled-back enqueue must not wake anyone
+        def enqueue_and_roll_back():
+            with session_factory() as db:
+                db.add(QueueItem(run_id=str(uuid.uuid4())))
+                publish_queue_change(db)
+                db.rollback()
+
+        await asyncio.to_thread(enqueue_and_roll_back)
+        await asyncio.sleep(0.5)
+        assert not woken.is_set()
+
+        # Enqueue from "another process": a separate sync engine and session
+        def enqueue():
+            with session_factory() as db:
+                return QueueManager()._add_queue_item(db, str(uuid.uuid4()), None, None)
+
+        assert await asyncio.to_thread(enqueue)
+        await asyncio.wait_for(woken.wait(), timeout=5)
+
+        await listener.stop()
+        await async_engine.dispose()
+
+    asyncio.run(scenario())
+    engine.dispose()
@@ -0,0 +1,113 @@
+"""Queue leases: reaping expired claims and fencing claims that were lost."""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from backend.models import QueueItem, Run, RunLog, RunStatus, LogLevel
+from backend.services import queue
+from backend.services.executor import PipelineExecutor
+from backend.services.queue import QueueWorker, claim_queue_items, reap_expired_leases, renew_lease
+
+
+@pytest.fixture()
+def logged(monkeypatch):
+    """Run log lines written through the sink, as (run_id, level, message)."""
+    lines = []
+    monkeypatch.setattr(queue.run_log_sink, "add", lambda run_id, level, message: lines.append((run_id, level, message)))
+    return lines
+
+
+def _add_claimed(db, status: str, attempts: int, expired: bool = True) -> str:
+    run_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    db.add(Run(id=run_id, prompt="test", settings_json={}, status=status))
+    db.add(QueueItem(
+        run_id=run_id,
+        picked_at=now - timedelta(minutes=5),
+        lease_expires_at=now + timedelta(minutes=-1 if expired else 1),
+        attempts=attempts
+    ))
+    return run_id
+
+
+def test_reaper_requeues_fails_and_closes(session_factory, logged):
+    with session_factory() as db:
+        # The closed item comes first, so the items after it are only reaped
+        # if closing doesn't abort the pass
+        closed = _add_claimed(db, RunStatus.CANCELED, attempts=1)
+        requeued = _add_claimed(db, RunStatus.RUNNING, attempts=1)
+        failed = _add_claimed(db, RunStatus.RUNNING, attempts=3)
+        live = _add_claimed(db, RunStatus.RUNNING, attempts=1, expired=False)
+        db.commit()
+
+    with session_factory() as db:
+        counts = reap_expired_leases(db, max_attempts=3)
+
+    assert counts == {"requeued": 1, "failed": 1, "closed": 1}
+
+    with session_factory() as db:
+        items = {item.run_id: item for item in db.query(QueueItem).all()}
+        statuses = dict(db.query(Run.id, Run.status).all())
+
+    assert items[closed].done_at is not None and statuses[closed] == RunStatus.CANCELED
+    assert items[requeued].picked_at is None and items[requeued].done_at is None
+    assert statuses[requeued] == RunStatus.QUEUED
+    assert items[failed].done_at is not None and statuses[failed] == RunStatus.FAILED
+    assert items[live].lease_expires_at is not None and statuses[live] == RunStatus.RUNNING
+
+    # One line per reaped run that is still live, each against its own run
+    assert [(run_id, level) for run_id, level, _ in logged] == [
+        (requeued, LogLevel.WARN),
+        (failed, LogLevel.ERROR),
+    ]
+
+
+def _expire_leases(db) -> None:
+    db.execute(update(QueueItem).values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+
+def test_lost_claim_cannot_renew_or_finish(session_factory, logged):
+    worker = QueueWorker(executor=PipelineExecutor(mode="thread"))
+    run_id = str(uuid.uuid4())
+    with session_factory() as db:
+        db.add(Run(id=run_id, prompt="test", settings_json={}, status=RunStatus.QUEUED))
+        db.add(QueueItem(run_id=run_id))
+        db.commit()
+
+    # Worker A claims and starts the run, then stops heartbeating
+    with session_factory() as db:
+        [claim_a] = claim_queue_items(db)
+        assert worker._start_runs_sync(db, [claim_a]) == [claim_a]
+        _expire_leases(db)
+        assert reap_expired_leases(db, max_attempts=3)["requeued"] == 1
+
+    # Requeued but not yet claimed again: A can't finish the run
+    with session_factory() as db:
+        assert not renew_lease(db, claim_a)
+        worker._finish_run_sync(db, claim_a, RunStatus.COMPLETED, LogLevel.INFO, "done", None)
+        assert db.get(Run, run_id).status == RunStatus.QUEUED
+
+    # Worker B claims it; A still can't renew B's lease or finish B's run
+    with session_factory() as db:
+        [claim_b] = claim_queue_items(db)
+        assert claim_b.run_id == run_id and claim_b.attempt == claim_a.attempt + 1
+        worker._start_runs_sync(db, [claim_b])
+
+        assert not renew_lease(db, claim_a)
+        worker._finish_run_sync(db, claim_a, RunStatus.COMPLETED, LogLevel.INFO, "done", None)
+        assert db.get(Run, run_id).status == RunStatus.RUNNING
+        assert db.query(QueueItem).filter(QueueItem.run_id == run_id).one().done_at is None
+
+        assert renew_lease(db, claim_b)
+        worker._finish_run_sync(db, claim_b, RunStatus.COMPLETED, LogLevel.INFO, "done", None)
+
+    with session_factory() as db:
+        db.expire_all()
+        assert db.get(Run, run_id).status == RunStatus.COMPLETED
+        assert db.query(QueueItem).filter(QueueItem.run_id == run_id).one().done_at is not None
+        # The final line is written with the status, once
+        assert [line.message for line in db.query(RunLog).filter(RunLog.run_id == run_id)] == ["done"]
@@ -0,0 +1,100 @@
+"""Queue worker: pipelines abandoned on timeout or shutdown are told to stop."""
+
+import asyncio
+import threading
+import time
+import uuid
+
+from backend.models import Run, RunStatus
+from backend.services import queue
+from backend.services.db import SessionLocal
+from backend.services.executor import PipelineExecutor
+from backend.services.queue import QueueWorker
+
+
+def _pipeline(stopped: threading.Event):
+    """Pipeline that runs until its token is canceled, like one blocked on an LLM call."""
+    def run(prompt, token):
+        while not token.is_canceled():
+            time.sleep(0.01)
+        stopped.set()
+        return {"status": "canceled"}
+    return run
+
+
+def test_timed_out_pipeline_is_canceled(monkeypatch):
+    run_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Run(id=run_id, prompt="test", settings_json={}, status=RunStatus.RUNNING))
+        db.commit()
+
+    stopped = threading.Event()
+    monkeypatch.setattr(queue, "execute_build", _pipeline(stopped))
+    worker = QueueWorker(executor=PipelineExecutor(mode="thread", run_timeout=0.2))
+
+    async def scenario():
+        token = worker.executor.new_token()
+        result = await worker._execute_build_async(run_id, token)
+        assert result["timed_out"]
+        assert token.is_canceled()
+
+    asyncio.run(scenario())
+    assert stopped.wait(timeout=2)
+    worker.executor.shutdown()
+
+
+def test_stop_cancels_pipelines_still_running_after_drain():
+    stopped = threading.Event()
+    worker = QueueWorker(executor=PipelineExecutor(mode="thread"), drain_timeout=0.2)
+
+    async def scenario():
+        token = worker.executor.new_token()
+        worker.cancel_tokens["run"] = token
+        worker.running_tasks["run"] = asyncio.create_task(
+            worker.executor.run(_pipeline(stopped), "prompt", token)
+        )
+        await worker.stop()
+        assert worker.running_tasks["run"].cancelled()
+
+    asyncio.run(scenario())
+    assert stopped.wait(timeout=2)
+
+
+def _seen_canceled(token) -> bool:
+    return token.is_canceled()
+
+
+def test_process_tokens_never_block_the_loop():
+    executor = PipelineExecutor(mode="process", max_workers=1)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        gaps, stop = [], asyncio.Event()
+
+        async def tick():
+            last = loop.time()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                gaps.append(loop.time() - last)
+                last = loop.time()
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0.05)
+        # Spawns the manager process; slow, but off the loop
+        await executor.start()
+        token = await executor.new_token_async()
+        assert not await token.is_canceled_async()
+        await token.cancel_async()
+        assert await token.is_canceled_async()
+        stop.set()
+        await ticker
+
+        # The pipeline process sees the flag set from the loop
+        assert await executor.run(_seen_canceled, token)
+        return max(gaps)
+
+    try:
+        # Spawning the manager on the loop would stall it for 100ms or more
+        assert asyncio.run(scenario()) < 0.08
+    finally:
+        executor.shutdown()
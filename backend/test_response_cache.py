@@ -0,0 +1,105 @@
+"""Response cache: byte-bounded LRU, and which run responses get cached."""
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from backend.app.main import IMMUTABLE_CACHE_CONTROL
+from backend.models import Run, RunStatus
+from backend.services.blobs import store_diffs
+from backend.services.db import SessionLocal
+from backend.services.response_cache import _ENTRY_OVERHEAD, ResponseCache, terminal_responses
+from backend.services.state import create_run_state_manager
+
+
+def _body(size: int) -> bytes:
+    return b"x" * (size - _ENTRY_OVERHEAD)
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    cache = ResponseCache(max_bytes=3000, max_entry_bytes=3000)
+    for key in ("a", "b", "c"):
+        assert cache.put(key, _body(1000), f'"{key}"')
+    assert cache.size_bytes == 3000
+
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a").etag == '"a"'
+    cache.put("d", _body(1500), '"d"')
+    assert [key for key in "abcd" if cache.get(key)] == ["a", "d"]
+    assert cache.size_bytes == 2500
+
+    # Replacing an entry only counts its new size
+    cache.put("a", _body(500), '"a2"')
+    assert cache.size_bytes == 2000 and cache.get("a").etag == '"a2"'
+
+
+def test_rejects_entries_over_max_entry_bytes():
+    cache = ResponseCache(max_bytes=3000, max_entry_bytes=1000)
+    assert cache.put("small", _body(1000), '"small"')
+    assert not cache.put("large", _body(1001), '"large"')
+    assert cache.get("large") is None
+    assert cache.stats()["entries"] == 1 and cache.size_bytes == 1000
+
+    # Disabled: nothing fits
+    assert not ResponseCache(max_bytes=0).put("small", _body(1000), '"small"')
+
+
+def _add_run(status: str) -> str:
+    run_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Run(id=run_id, prompt="test", settings_json={}, status=status))
+        store_diffs(db, run_id, [{"path": "app.py", "content": f"# {run_id}\n"}])
+        db.commit()
+    return run_id
+
+
+def _settle(run_id: str) -> None:
+    """Make a terminal run look like it ended long enough ago to be cached."""
+    with SessionLocal() as db:
+        db.execute(update(Run).where(Run.id == run_id).values(updated_at=datetime.utcnow() - timedelta(minutes=5)))
+        db.commit()
+
+
+def _cached(run_id: str):
+    return [kind for kind in ("run", "diffs") if terminal_responses._entries.get((kind, run_id))]
+
+
+def test_runs_are_cached_only_once_settled(client):
+    run_id = _add_run(RunStatus.RUNNING)
+    assert client.get(f"/runs/{run_id}").headers["Cache-Control"] == "no-cache"
+    client.get(f"/runs/{run_id}/diffs")
+
+    with SessionLocal() as db:
+        assert create_run_state_manager(db).transition_status(run_id, RunStatus.COMPLETED)
+
+    # Just ended: late log lines may still arrive, so nothing is cached yet
+    response = client.get(f"/runs/{run_id}")
+    assert response.json()["status"] == RunStatus.COMPLETED
+    assert response.headers["Cache-Control"] == "no-cache"
+    client.get(f"/runs/{run_id}/diffs")
+    assert _cached(run_id) == []
+
+    _settle(run_id)
+    fresh = {path: client.get(path) for path in (f"/runs/{run_id}", f"/runs/{run_id}/diffs")}
+    assert _cached(run_id) == ["run", "diffs"]
+
+    hits = terminal_responses.hits
+    for path, response in fresh.items():
+        cached = client.get(path)
+        assert cached.content == response.content
+        assert cached.headers["ETag"] == response.headers["ETag"]
+        assert cached.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+        revalidated = client.get(path, headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+    assert terminal_responses.hits == hits + 4
+
+
+def test_responses_over_max_entry_bytes_are_served_uncached(client, monkeypatch):
+    run_id = _add_run(RunStatus.COMPLETED)
+    _settle(run_id)
+    monkeypatch.setattr(terminal_responses, "max_entry_bytes", _ENTRY_OVERHEAD + 10)
+
+    response = client.get(f"/runs/{run_id}/diffs")
+    assert response.status_code == 200 and response.json()["diffs"][0]["path"] == "app.py"
+    assert _cached(run_id) == []
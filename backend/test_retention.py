@@ -0,0 +1,68 @@
+"""Retention: archived runs read back the same as before archiving."""
+
+import uuid
+
+import pytest
+
+from backend.models import Run, RunLog, RunStatus
+from backend.services.blobs import store_diffs
+from backend.services.db import SessionLocal
+from backend.services.retention import archive_run
+
+DIFFS = [
+    {"path": "src/app.py", "content": "print('hello')\n" * 40},
+    {"path": "README.md", "content": "# App\n"},
+]
+
+
+def _add_finished_run(num_logs: int) -> str:
+    run_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Run(id=run_id, prompt="test", settings_json={}, status=RunStatus.COMPLETED))
+        db.add_all([RunLog(run_id=run_id, level="info", message=f"line {i}") for i in range(num_logs)])
+        store_diffs(db, run_id, DIFFS)
+        db.commit()
+    return run_id
+
+
+def _all_logs(client, run_id: str):
+    logs, cursor = [], 0
+    while True:
+        page = client.get(f"/runs/{run_id}/logs", params={"after": cursor, "limit": 7}).json()
+        logs += page["logs"]
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            return logs
+
+
+def _reads(client, run_id: str):
+    return (
+        client.get(f"/runs/{run_id}").json(),
+        client.get(f"/runs/{run_id}/diffs").json(),
+        _all_logs(client, run_id),
+    )
+
+
+# More lines than GET /runs/{id} returns, and fewer
+@pytest.mark.parametrize("num_logs", [60, 12])
+def test_archived_run_reads_the_same(client, num_logs):
+    run_id = _add_finished_run(num_logs)
+    before = _reads(client, run_id)
+    assert len(before[2]) == num_logs and before[1]["diffs"] == DIFFS
+
+    with SessionLocal() as db:
+        assert archive_run(db, run_id)
+        assert db.query(RunLog).filter(RunLog.run_id == run_id).count() == 0
+
+    assert _reads(client, run_id) == before
+
+
+def test_lines_logged_after_archiving_follow_the_archive(client):
+    run_id = _add_finished_run(5)
+    with SessionLocal() as db:
+        assert archive_run(db, run_id)
+        db.add(RunLog(run_id=run_id, level="info", message="late"))
+        db.commit()
+
+    assert [log["message"] for log in _all_logs(client, run_id)] == [f"line {i}" for i in range(5)] + ["late"]
+    assert client.get(f"/runs/{run_id}").json()["logs"][-2:] == ["line 4", "late"]
@@ -0,0 +1,183 @@
+"""Run logs: keyset pagination of GET /runs/{id}/logs and the /runs/{id}/events stream."""
+
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from backend.app.main import _cancel_run, run_event_stream
+from backend.models import Run, RunLog, RunStatus
+from backend.services.db import SessionLocal
+from backend.services.events import LOG, run_events
+from backend.services.retention import archive_run
+
+
+def _add_run(status: str = RunStatus.RUNNING) -> str:
+    run_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Run(id=run_id, prompt="test", settings_json={}, status=status))
+        db.commit()
+    return run_id
+
+
+def _log(run_id: str, *messages: str) -> None:
+    with SessionLocal() as db:
+        db.add_all([RunLog(run_id=run_id, level="info", message=message) for message in messages])
+        db.commit()
+
+
+def _page(client, run_id: str, after: int, limit: int):
+    return client.get(f"/runs/{run_id}/logs", params={"after": after, "limit": limit}).json()
+
+
+@pytest.fixture()
+def interleaved():
+    """Two runs logging in turn, so each run's log ids have gaps."""
+    run_id, other = _add_run(), _add_run()
+    for i in range(7):
+        _log(run_id, f"line {i}")
+        _log(other, f"other {i}")
+    return run_id
+
+
+def test_pages_cover_every_line_once(client, interleaved):
+    messages, cursor, pages = [], 0, 0
+    while True:
+        page = _page(client, interleaved, cursor, 3)
+        messages += [log["message"] for log in page["logs"]]
+        assert page["next_cursor"] == (page["logs"][-1]["id"] if page["logs"] else cursor)
+        cursor = page["next_cursor"]
+        pages += 1
+        if not page["has_more"]:
+            break
+    assert messages == [f"line {i}" for i in range(7)]
+    assert pages == 3
+
+
+def test_cursor_boundaries(client, interleaved):
+    ids = [log["id"] for log in _page(client, interleaved, 0, 100)["logs"]]
+
+    # Exactly ``limit`` lines left: no further page
+    last_page = _page(client, interleaved, ids[3], 3)
+    assert [log["id"] for log in last_page["logs"]] == ids[4:]
+    assert not last_page["has_more"]
+
+    # The cursor itself is excluded; a cursor in a gap resumes at the next line
+    assert _page(client, interleaved, ids[2], 1)["logs"][0]["id"] == ids[3]
+    assert _page(client, interleaved, ids[2] + 1, 1)["logs"][0]["id"] == ids[3]
+
+    # Past the end: empty, and the cursor is handed back for the next poll
+    assert _page(client, interleaved, ids[-1], 3) == {
+        "run_id": interleaved, "logs": [], "next_cursor": ids[-1], "has_more": False
+    }
+    _log(interleaved, "new")
+    assert [log["message"] for log in _page(client, interleaved, ids[-1], 3)["logs"]] == ["new"]
+
+
+def test_pages_continue_from_archive_into_table(client):
+    run_id = _add_run(RunStatus.COMPLETED)
+    _log(run_id, *[f"archived {i}" for i in range(4)])
+    with SessionLocal() as db:
+        assert archive_run(db, run_id)
+    _log(run_id, "late 0", "late 1")
+
+    first = _page(client, run_id, 0, 3)
+    assert [log["message"] for log in first["logs"]] == ["archived 0", "archived 1", "archived 2"]
+    assert first["has_more"]
+    second = _page(client, run_id, first["next_cursor"], 3)
+    assert [log["message"] for log in second["logs"]] == ["archived 3", "late 0", "late 1"]
+    assert not second["has_more"]
+
+
+def test_unknown_run_is_404(client):
+    assert client.get(f"/runs/{uuid.uuid4()}/logs").status_code == 404
+
+
+def _events(lines):
+    """Parse the lines of a Server-Sent Events stream into (id, event, data) tuples."""
+    event_id = event = data = None
+    for line in lines:
+        if line.startswith("id: "):
+            event_id = int(line[4:])
+        elif line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+        elif not line and event:
+            yield event_id, event, data
+            event_id = event = data = None
+
+
+def _stream(client, run_id: str, **kwargs):
+    # TestClient reads the whole response, so only streams of terminal runs end here
+    with client.stream("GET", f"/runs/{run_id}/events", **kwargs) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return list(_events(response.iter_lines()))
+
+
+def test_event_stream_resumes_after_last_event_id(client):
+    run_id = _add_run(RunStatus.COMPLETED)
+    _log(run_id, *[f"line {i}" for i in range(5)])
+
+    events = _stream(client, run_id)
+    _, event, data = events[0]
+    assert (event, data["status"]) == ("status", RunStatus.COMPLETED)
+    logs = [(event_id, data) for event_id, event, data in events if event == "log"]
+    assert [data["message"] for _, data in logs] == [f"line {i}" for i in range(5)]
+    assert all(event_id == data["id"] for event_id, data in logs)
+    assert events[-1] == (None, "end", {"status": RunStatus.COMPLETED})
+
+    # A reconnecting EventSource sends the id of the last event it saw
+    resumed = _stream(client, run_id, headers={"Last-Event-ID": str(logs[2][0])})
+    assert [data["message"] for _, event, data in resumed if event == "log"] == ["line 3", "line 4"]
+    assert resumed[-1][1] == "end"
+
+    # ``after`` resumes the same way; the later of the two cursors wins
+    resumed = _stream(client, run_id, params={"after": logs[3][0]}, headers={"Last-Event-ID": str(logs[1][0])})
+    assert [data["message"] for _, event, data in resumed if event == "log"] == ["line 4"]
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def _cancel_with_log(run_id: str) -> None:
+    """Cancel a run and log a line, publishing both like the API does."""
+    with SessionLocal() as db:
+        _cancel_run(db, run_id)
+        line = RunLog(run_id=run_id, level="info", message="canceled")
+        db.add(line)
+        db.flush()
+        run_events.record(db, run_id, LOG, {"id": line.id})
+        db.commit()
+
+
+def test_event_stream_follows_run_until_it_ends():
+    run_id = _add_run(RunStatus.RUNNING)
+    _log(run_id, "started")
+
+    async def scenario():
+        # Its own loop, driving the handler directly: the stream of a live run
+        # never ends, and TestClient would wait for the whole response
+        run_events.bind()
+        response = await run_event_stream(run_id, _ConnectedRequest(), after=None, last_event_id=None)
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk)
+            if '"message": "started"' in chunk:
+                await asyncio.to_thread(_cancel_with_log, run_id)
+        return "".join(chunks).split("\n")
+
+    events = [(event, data) for _, event, data in _events(asyncio.run(asyncio.wait_for(scenario(), 30)))]
+    assert [event for event, _ in events] == ["status", "log", "status", "log", "end"]
+    assert events[0][1]["status"] == RunStatus.RUNNING
+    assert events[1][1]["message"] == "started"
+    assert events[2][1]["status"] == RunStatus.CANCELED
+    assert events[3][1]["message"] == "canceled"
+    assert events[4][1] == {"status": RunStatus.CANCELED}
+
+
+def test_event_stream_of_unknown_run_is_404(client):
+    assert client.get(f"/runs/{uuid.uuid4()}/events").status_code == 404
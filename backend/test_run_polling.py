@@ -0,0 +1,100 @@
+"""Run polling: ETag revalidation and long-polling of GET /runs/{id}."""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from backend.app.main import IMMUTABLE_CACHE_CONTROL
+from backend.models import Run, RunLog, RunStatus
+from backend.services.db import SessionLocal
+from backend.services.response_cache import terminal_responses
+from backend.services.retention import archive_run
+
+
+@pytest.fixture()
+def run_id():
+    run_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Run(id=run_id, prompt="test", settings_json={}, status=RunStatus.RUNNING))
+        db.commit()
+    return run_id
+
+
+def test_unchanged_run_is_304(client, run_id):
+    first = client.get(f"/runs/{run_id}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+
+    for if_none_match in (etag, etag[2:], f'"other", {etag}', "*"):
+        response = client.get(f"/runs/{run_id}", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.headers["ETag"] == etag
+        assert not response.content
+
+    # A new log line changes the ETag even though the run row didn't change
+    with SessionLocal() as db:
+        db.add(RunLog(run_id=run_id, level="info", message="step"))
+        db.commit()
+    response = client.get(f"/runs/{run_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert response.json()["logs"] == ["step"]
+
+
+def test_long_poll_times_out_with_304(client, run_id):
+    etag = client.get(f"/runs/{run_id}").headers["ETag"]
+    started = time.monotonic()
+    response = client.get(f"/runs/{run_id}", params={"wait": 1}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert 1 <= time.monotonic() - started < 5
+
+
+def test_long_poll_wakes_on_change(client, run_id):
+    etag = client.get(f"/runs/{run_id}").headers["ETag"]
+    polled = {}
+
+    def poll():
+        started = time.monotonic()
+        polled["response"] = client.get(f"/runs/{run_id}", params={"wait": 30}, headers={"If-None-Match": etag})
+        polled["elapsed"] = time.monotonic() - started
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    time.sleep(0.3)
+    assert client.post(f"/runs/{run_id}/cancel").json() == {"ok": True}
+    poller.join(timeout=10)
+
+    response = polled["response"]
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert response.json()["status"] == RunStatus.CANCELED
+    # Woken by the change, not by the periodic resync or the deadline
+    assert polled["elapsed"] < 1.5
+
+
+def test_long_poll_without_etag_answers_at_once(client, run_id):
+    started = time.monotonic()
+    assert client.get(f"/runs/{run_id}", params={"wait": 30}).status_code == 200
+    assert time.monotonic() - started < 1.5
+
+
+def test_settled_run_keeps_its_etag_when_archived(client, run_id):
+    with SessionLocal() as db:
+        db.add(RunLog(run_id=run_id, level="info", message="done"))
+        db.execute(update(Run).where(Run.id == run_id).values(
+            status=RunStatus.COMPLETED, updated_at=datetime.utcnow() - timedelta(minutes=5)
+        ))
+        db.commit()
+    response = client.get(f"/runs/{run_id}")
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+
+    with SessionLocal() as db:
+        assert archive_run(db, run_id)
+    # Answer from the database again rather than the response cache
+    terminal_responses.clear()
+
+    archived = client.get(f"/runs/{run_id}")
+    assert archived.headers["ETag"] == response.headers["ETag"]
+    assert archived.content == response.content
+    assert client.get(f"/runs/{run_id}", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
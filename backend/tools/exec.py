@@ -1,16 +1,26 @@
 import subprocess
 import shlex
+import time
 from typing import List, Tuple, Optional
 
+from ..services.cancellation import CancellationToken, RunCanceled
+
 
 DEFAULT_ENV_BLOCKLIST = {"AWS_SECRET_ACCESS_KEY", "GOOGLE_APPLICATION_CREDENTIALS"}
 
 
-def run_non_interactive(commands: List[str], cwd: Optional[str] = None, timeout: int = 900) -> Tuple[int, str, str]:
+# How often a running subprocess re-checks its cancellation token
+CANCEL_POLL_INTERVAL = 0.25
+
+
+def run_non_interactive(commands: List[str], cwd: Optional[str] = None, timeout: int = 900,
+                        cancel_token: Optional[CancellationToken] = None) -> Tuple[int, str, str]:
     """Run a sequence of commands safely without invoking a shell.
 
     Each command is split with shlex.split and executed as a separate subprocess.
     Execution stops on first non-zero return code. Stdout/stderr are accumulated.
+    If cancel_token is canceled, the running subprocess is killed and
+    RunCanceled is raised.
     """
 
     combined_out: List[str] = []
@@ -20,27 +30,40 @@ def run_non_interactive(commands: List[str], cwd: Optional[str] = None, timeout:
         cmd = command.strip()
         if not cmd:
             continue
+        if cancel_token is not None:
+            cancel_token.raise_if_canceled()
         args = shlex.split(cmd)
-        try:
-            result = subprocess.run(
-                args,
-                cwd=cwd,
-                check=False,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
-        except subprocess.TimeoutExpired:
-            combined_err.append("timeout")
-            return 124, "".join(combined_out), "\n".join(combined_err)
-
-        if result.stdout:
-            combined_out.append(result.stdout)
-        if result.stderr:
-            combined_err.append(result.stderr)
-
-        if result.returncode != 0:
-            return result.returncode, "".join(combined_out), "\n".join(combined_err)
+        proc = subprocess.Popen(
+            args,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=CANCEL_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                # communicate() can be retried after a timeout without losing output
+                if cancel_token is not None and cancel_token.is_canceled():
+                    proc.kill()
+                    proc.communicate()
+                    raise RunCanceled(f"Canceled while running: {cmd}")
+                if time.monotonic() >= deadline:
+                    proc.kill()
+                    proc.communicate()
+                    combined_err.append("timeout")
+                    return 124, "".join(combined_out), "\n".join(combined_err)
+
+        if stdout:
+            combined_out.append(stdout)
+        if stderr:
+            combined_err.append(stderr)
+
+        if proc.returncode != 0:
+            return proc.returncode, "".join(combined_out), "\n".join(combined_err)
 
     return 0, "".join(combined_out), "\n".join(combined_err)
 
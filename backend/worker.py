@@ -0,0 +1,105 @@
+"""Standalone queue worker process, decoupled from the FastAPI app.
+
+Run one or more of these next to API replicas started with EMBEDDED_WORKER=false:
+
+    python -m backend.worker --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+
+from prometheus_client import start_http_server
+
+from .services.concurrency import limiter_from_env
+from .services.counters import reconcile_periodically
+from .services.db import AsyncSessionLocal, async_engine, init_db
+from .services.log_sink import run_log_sink
+from .services import metrics
+from .services.queue import QueueWorker
+
+logger = logging.getLogger(__name__)
+
+
+async def run_worker(max_concurrent: int, poll_interval: float,
+                     lease_seconds: float, max_attempts: int) -> None:
+    """Run a queue worker until SIGTERM/SIGINT, then drain in-flight runs."""
+    init_db()
+
+    worker = QueueWorker(
+        max_concurrent=max_concurrent,
+        poll_interval=poll_interval,
+        install_signal_handlers=True,
+        lease_seconds=lease_seconds,
+        max_attempts=max_attempts,
+        limiter=limiter_from_env(initial=max_concurrent),
+    )
+    mode = "adaptive" if worker.limiter else "fixed"
+    logger.info(f"Standalone worker starting (max_concurrent={max_concurrent} {mode}, poll_interval={poll_interval}s)")
+
+    stop_monitors = asyncio.Event()
+    lag_task = asyncio.create_task(metrics.monitor_event_loop_lag(stop_monitors))
+    # The run/queue gauges come from run_counters, which only sees this
+    # process's changes between reconciliations, as in the API
+    reconcile_task = asyncio.create_task(reconcile_periodically(
+        AsyncSessionLocal,
+        interval=float(os.getenv("COUNTER_RECONCILE_INTERVAL", "30")),
+        stop_event=stop_monitors
+    ))
+    await run_log_sink.start()
+    await worker.start()
+    await worker.stop()
+    await run_log_sink.stop()
+    stop_monitors.set()
+    await lag_task
+    await reconcile_task
+    await async_engine.dispose()
+
+
+def main() -> None:
+    """Parse settings from CLI flags / environment and run the worker."""
+    parser = argparse.ArgumentParser(description="Process queued build runs outside the API process.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("WORKER_MAX_CONCURRENT", "2")),
+        help="Maximum runs processed concurrently by this worker; the starting limit when "
+             "WORKER_ADAPTIVE_CONCURRENCY=true (env: WORKER_MAX_CONCURRENT)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=float(os.getenv("WORKER_POLL_INTERVAL", "2.0")),
+        help="Seconds between queue polls; on PostgreSQL enqueues from API processes also wake "
+             "workers via LISTEN/NOTIFY, so polling is only a fallback (env: WORKER_POLL_INTERVAL)",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=float(os.getenv("QUEUE_LEASE_SECONDS", "60")),
+        help="Lease on claimed runs, renewed by heartbeats; expired leases are requeued "
+             "(env: QUEUE_LEASE_SECONDS)",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=int(os.getenv("QUEUE_MAX_ATTEMPTS", "3")),
+        help="Attempts before a run whose lease keeps expiring is failed (env: QUEUE_MAX_ATTEMPTS)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("WORKER_METRICS_PORT", "0")),
+        help="Serve Prometheus metrics on this port; 0 disables (env: WORKER_METRICS_PORT)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.metrics_port:
+        start_http_server(args.metrics_port, registry=metrics.registry)
+    asyncio.run(run_worker(args.concurrency, args.poll_interval, args.lease_seconds, args.max_attempts))
+
+
+if __name__ == "__main__":
+    main()
@@ -520,8 +520,8 @@ const App = {
       utils.setText('runId', response.run_id);
       utils.setText('status', 'Processing...');
       
-      // Start polling for updates
-      this.pollRunStatus(response.run_id);
+      // Follow updates over the event stream (polling where unsupported)
+      this.watchRun(response.run_id);
       
     } catch (error) {
       console.error('Error sending message:', error);
@@ -531,6 +531,37 @@ const App = {
     }
   },
 
+  watchRun(runId) {
+    if (typeof EventSource === 'undefined') {
+      this.pollRunStatus(runId);
+      return;
+    }
+
+    // EventSource reconnects on its own and resumes via Last-Event-ID
+    const source = new EventSource(`${CONFIG.backendBase}/runs/${encodeURIComponent(runId)}/events`);
+    source.addEventListener('status', (e) => {
+      utils.setText('status', JSON.parse(e.data).status);
+    });
+    source.addEventListener('log', (e) => {
+      ChatManager.updateLastMessage(JSON.parse(e.data).message);
+    });
+    source.addEventListener('end', (e) => {
+      source.close();
+      this.finishRun(JSON.parse(e.data).status);
+    });
+  },
+
+  finishRun(status) {
+    ChatManager.hideTyping();
+    utils.setText('status', 'Completed');
+
+    if (status === 'completed') {
+      utils.showToast('Build completed successfully!', 'success');
+    } else if (status === 'failed') {
+      utils.showToast('Build failed. Check the logs for details.', 'error');
+    }
+  },
+
   async pollRunStatus(runId) {
     try {
       const status = await utils.getJSON(`${CONFIG.backendBase}/runs/${runId}`);
@@ -551,14 +582,7 @@ const App = {
       if (status.status === 'queued' || status.status === 'running') {
         setTimeout(() => this.pollRunStatus(runId), CONFIG.pollInterval);
       } else {
-        ChatManager.hideTyping();
-        utils.setText('status', 'Completed');
-        
-        if (status.status === 'completed') {
-          utils.showToast('Build completed successfully!', 'success');
-        } else if (status.status === 'failed') {
-          utils.showToast('Build failed. Check the logs for details.', 'error');
-        }
+        this.finishRun(status.status);
       }
       
     } catch (error) {